@@ -0,0 +1,215 @@
+# HTTP load benchmark of the app, it starts bench/server.py and drives each scenario over the loopback
+from typing import Any, Dict, List, Optional
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "bench"), os.path.join(ROOT, "client")]
+
+from bitter_client.http import Connection, Request  # noqa: E402
+from scenarios import scenarios  # noqa: E402
+
+HOST = "127.0.0.1"
+# Metrics compared with the baseline and whether higher values are better
+METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "peak_heap_kb": False,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies:List[float] = []
+        self.errors = 0
+        self.shed = 0
+
+
+async def worker(port:int, mix:List[Request], weights:List[int], deadline:float, stats:Optional[Stats],
+                 rng:random.Random) -> None:
+    connection = None
+    try:
+        while time.perf_counter() < deadline:
+            request = rng.choices(mix, weights)[0]
+            start = time.perf_counter()
+            try:
+                if connection is None:
+                    connection = await Connection.open(HOST, port, 5.0)
+                responses = await connection.exchange([request], HOST, 5.0)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                responses = []
+
+            elapsed = time.perf_counter() - start
+            if not connection or not connection.reusable:
+                if connection:
+                    connection.close()
+                connection = None
+
+            if stats is None:
+                continue
+            if not responses or responses[0].status >= 500 and responses[0].status != 503:
+                stats.errors += 1
+            elif responses[0].status == 503:
+                stats.shed += 1
+            else:
+                stats.latencies.append(elapsed)
+
+    finally:
+        # Workers of the timing benchmarks are cancelled instead of reaching the deadline
+        if connection:
+            connection.close()
+
+
+async def heap(port:int, reset:bool=False) -> Dict[str, int]:
+    connection = await Connection.open(HOST, port, 5.0)
+    try:
+        response = (await connection.exchange([Request("POST" if reset else "GET", "/_bench/heap")], HOST, 5.0))[0]
+        return response.data() or {}
+    finally:
+        connection.close()
+
+
+def percentile(values:List[float], fraction:float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+async def run_scenario(port:int, name:str, concurrency:int, duration:float, warmup:float,
+                       seed:int) -> Dict[str, Any]:
+    mix = [request for _, request in scenarios[name]]
+    weights = [weight for weight, _ in scenarios[name]]
+    rng = random.Random(seed)
+
+    deadline = time.perf_counter() + warmup
+    await asyncio.gather(*(worker(port, mix, weights, deadline, None, rng) for _ in range(concurrency)))
+
+    await heap(port, reset=True)
+    stats = Stats()
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(worker(port, mix, weights, deadline, stats, rng) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    peak = (await heap(port))["peak"]
+
+    latencies = sorted(stats.latencies)
+    return {
+        "requests": len(latencies),
+        "errors": stats.errors,
+        "shed": stats.shed,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_heap_kb": round(peak / 1024, 1),
+    }
+
+
+async def wait_for_server(port:int, timeout:float=10.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(HOST, port)
+            writer.close()
+            return
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def compare(results:Dict[str, Any], baseline:Dict[str, Any], tolerance:float) -> List[str]:
+    regressions = []
+    for name, result in results["scenarios"].items():
+        if not (reference := baseline.get("scenarios", {}).get(name)):
+            continue
+
+        for metric, higher_is_better in METRICS.items():
+            value, expected = result[metric], reference.get(metric)
+            if not expected:
+                continue
+
+            change = (value - expected) / expected
+            if change < -tolerance if higher_is_better else change > tolerance:
+                regressions.append(f"{name}: {metric} {value} vs {expected} in the baseline ({change:+.0%})")
+
+    return regressions
+
+
+async def start_server(port:int) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "bench", "server.py"), "--port", str(port)],
+                              stdout=subprocess.DEVNULL)
+    try:
+        await wait_for_server(port)
+    except OSError:
+        server.terminate()
+        raise
+
+    return server
+
+
+async def run(args:argparse.Namespace) -> Dict[str, Any]:
+    server = await start_server(args.port)
+    try:
+        results = {
+            "runtime": f"{platform.python_implementation()} {platform.python_version()}",
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "scenarios": {},
+        }
+        for i, name in enumerate(args.scenarios):
+            results["scenarios"][name] = await run_scenario(args.port, name, args.concurrency, args.duration,
+                                                            args.warmup, args.seed + i)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the HTTP load benchmarks of the app")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"Default: all ({', '.join(scenarios)})")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Connections sending requests at once")
+    parser.add_argument("-d", "--duration", type=float, default=5.0, help="Seconds each scenario is measured")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds of load before measuring")
+    parser.add_argument("--port", type=int, default=5180)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write the results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Compare the results with this file and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative change allowed by the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results to the baseline file")
+    args = parser.parse_args()
+
+    args.scenarios = args.scenarios or list(scenarios)
+    if unknown := [name for name in args.scenarios if name not in scenarios]:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output)
+    else:
+        sys.stdout.write(output)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as fh:
+            fh.write(output)
+
+    elif args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
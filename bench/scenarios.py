@@ -0,0 +1,29 @@
+from typing import Dict, List, Tuple
+
+from bitter_client import api
+from bitter_client.http import Request
+
+# Each scenario is a weighted mix of requests, workers pick one at random for every request they send
+scenarios:Dict[str, List[Tuple[int, Request]]] = {
+    "read": [
+        (1, api.state("led")),
+    ],
+    "write": [
+        (1, api.on("led")),
+        (1, api.off("led")),
+    ],
+    "mixed": [
+        (60, api.state("led")),
+        (10, api.state("d1")),
+        (10, api.on("led")),
+        (10, api.off("led")),
+        (5, api.batch([{"pin": "d1", "cmd": "on"}, {"pin": "d2", "cmd": "off"}, {"pin": "led", "cmd": "on"}])),
+        (5, api.jobs()),
+    ],
+    "modulate": [
+        (1, api.modulate("led", ["on", "delay 1", "off"])),
+    ],
+    "not_found": [
+        (1, api.state("nope")),
+    ],
+}
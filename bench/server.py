@@ -0,0 +1,75 @@
+# Runs the real app from src/ under CPython, with the stand-ins in bench/stubs in place of the MicroPython modules
+from typing import Any, Dict, List, Tuple
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TICKS_MASK = 0x3fffffff
+
+
+def install() -> None:
+    # frozen/ goes after the standard library, it has stubs of typing and collections meant for the board
+    sys.path[:0] = [os.path.join(ROOT, "bench", "stubs"), os.path.join(ROOT, "src")]
+    sys.path.append(os.path.join(ROOT, "frozen"))
+
+    # time is built into CPython and can't be replaced by a module, the MicroPython functions are added to it
+    time.ticks_ms = lambda: time.perf_counter_ns() // 1000000 & TICKS_MASK
+    time.ticks_us = lambda: time.perf_counter_ns() // 1000 & TICKS_MASK
+    time.ticks_cpu = time.ticks_us
+    time.ticks_add = lambda ticks, delta: (ticks + delta) & TICKS_MASK
+    time.ticks_diff = lambda end, start: ((end - start + (TICKS_MASK + 1) // 2) & TICKS_MASK) - (TICKS_MASK + 1) // 2
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+
+
+def read_config(name:str) -> Dict[str, Any]:
+    with open(os.path.join(ROOT, "etc", name)) as fh:
+        return json.load(fh)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the app on the loopback for the benchmarks")
+    parser.add_argument("--port", type=int, default=5180)
+    args = parser.parse_args()
+
+    install()
+    tracemalloc.start()
+
+    import gpio
+    import machine
+    import routes
+
+    gpio.setup(read_config("pin_names.json")["gpio"], read_config("gpio_config.json"))
+
+    # Heap usage is queried through the app itself, the extra routes don't change the cost of the others
+    @routes.app.get("/_bench/heap")
+    async def get_heap(_request:Any) -> Dict[str, int]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {"current": current, "peak": peak}
+
+    @routes.app.post("/_bench/heap")
+    async def reset_heap(_request:Any) -> None:
+        tracemalloc.reset_peak()
+
+    # Pin transitions are only recorded between these two requests, so the load benchmarks don't accumulate them
+    @routes.app.post("/_bench/transitions")
+    async def start_recording(_request:Any) -> None:
+        machine.transitions.clear()
+        machine.recording = True
+
+    @routes.app.get("/_bench/transitions")
+    async def stop_recording(_request:Any) -> List[Tuple[int, int, int]]:
+        machine.recording = False
+        return machine.transitions
+
+    asyncio.run(routes.app.start_server(host="127.0.0.1", port=args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+# Stand-in for the MicroPython esp module
+SLEEP_NONE = 0
+SLEEP_LIGHT = 1
+SLEEP_MODEM = 2
+
+
+def sleep_type(sleep_type:int=None) -> int:
+    return SLEEP_NONE
+
+
+def osdebug(level:int) -> None:
+    pass
+
+
+def flash_size() -> int:
+    return 4 * 1024 * 1024
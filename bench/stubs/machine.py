@@ -0,0 +1,96 @@
+# Stand-in for the MicroPython machine module, pins keep their level in memory and interrupts never fire
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import time
+
+mem32:Dict[int, int] = {}
+
+# Every level change of the pins as (time.perf_counter_ns(), pin id, level), while recording is set
+transitions:List[Tuple[int, int, int]] = []
+recording = False
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    ALT = 3
+    ALT_OPEN_DRAIN = 4
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_RISING = 1
+    IRQ_FALLING = 2
+    LOW_POWER = 0
+    MED_POWER = 1
+    HIGH_POWER = 2
+
+    def __init__(self, pin_id:int, mode:int=-1, pull:int=-1, *, value:Any=None, drive:int=0, alt:int=-1):
+        self.pin_id = pin_id
+        self.level = 0
+        self.handler:Optional[Callable] = None
+        self.init(mode, pull, value=value)
+
+    def init(self, mode:int=-1, pull:int=-1, *, value:Any=None, drive:int=0, alt:int=-1) -> None:
+        if value is not None:
+            self.value(value)
+
+    def value(self, x:Any=None) -> Optional[int]:
+        if x is None:
+            return self.level
+
+        level = 1 if x else 0
+        if recording and level != self.level:
+            transitions.append((time.perf_counter_ns(), self.pin_id, level))
+        self.level = level
+        return None
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+    def irq(self, handler:Optional[Callable]=None, trigger:int=3, *, hard:bool=False) -> None:
+        self.handler = handler
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timer_id:int):
+        self.callback:Optional[Callable] = None
+
+    def init(self, *, period:int=-1, mode:int=PERIODIC, callback:Optional[Callable]=None) -> None:
+        self.callback = callback
+
+    def deinit(self) -> None:
+        self.callback = None
+
+
+def disable_irq() -> int:
+    return 0
+
+
+def enable_irq(state:int) -> None:
+    pass
+
+
+def bitstream(pin:Pin, encoding:int, timing:Any, data:Any) -> None:
+    pass
+
+
+def time_pulse_us(pin:Pin, level:int, timeout_us:int=1000000) -> int:
+    return -1
+
+
+def freq(hz:Optional[int]=None) -> int:
+    return 80000000
+
+
+def reset() -> None:
+    raise SystemExit
+
+
+def soft_reset() -> None:
+    raise SystemExit
@@ -0,0 +1,22 @@
+# Stand-in for the MicroPython micropython module, scheduled callbacks run right away
+from typing import Any, Callable
+
+
+def const(value:Any) -> Any:
+    return value
+
+
+def schedule(function:Callable, argument:Any) -> None:
+    function(argument)
+
+
+def mem_info(verbose:Any=None) -> None:
+    pass
+
+
+def qstr_info(verbose:Any=None) -> None:
+    pass
+
+
+def alloc_emergency_exception_buf(size:int) -> None:
+    pass
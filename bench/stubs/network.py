@@ -0,0 +1,33 @@
+# Stand-in for the MicroPython network module, the interfaces are always connected to the loopback
+from typing import Tuple
+
+STA_IF = 0
+AP_IF = 1
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_WRONG_PASSWORD = 2
+STAT_NO_AP_FOUND = 3
+STAT_CONNECT_FAIL = 4
+STAT_GOT_IP = 5
+
+
+class WLAN:
+    def __init__(self, interface:int=STA_IF):
+        self._active = False
+
+    def active(self, is_active:bool=None) -> bool:
+        if is_active is not None:
+            self._active = is_active
+        return self._active
+
+    def connect(self, ssid:str=None, key:str=None) -> None:
+        pass
+
+    def isconnected(self) -> bool:
+        return True
+
+    def status(self) -> int:
+        return STAT_GOT_IP
+
+    def ifconfig(self) -> Tuple[str, str, str, str]:
+        return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
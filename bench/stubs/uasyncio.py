@@ -0,0 +1,79 @@
+# Stand-in for uasyncio on top of asyncio, with the MicroPython extensions used by the app
+from typing import Any, Awaitable
+
+import asyncio
+import types
+from asyncio import *  # noqa: F401,F403
+
+
+class Task(asyncio.Task):
+    # uasyncio refuses to cancel the task that is running instead of cancelling it at its next suspension point
+    def cancel(self, msg:Any=None) -> bool:
+        # asyncio.run cancels the tasks left over once the loop is stopped
+        try:
+            running = asyncio.current_task()
+        except RuntimeError:
+            running = None
+        if self is running:
+            raise RuntimeError("can't cancel self")
+        return super().cancel(msg)
+
+
+def create_task(coro:Any) -> Task:
+    return Task(coro)
+
+
+def sleep_ms(ms:int) -> Awaitable:
+    return asyncio.sleep(ms / 1000)
+
+
+def wait_for_ms(awaitable:Awaitable, timeout:int) -> Awaitable:
+    return asyncio.wait_for(awaitable, timeout / 1000)
+
+
+class ThreadSafeFlag:
+    def __init__(self):
+        self._loop = None
+        self._event = None
+        self._pending = False
+
+    def set(self) -> None:
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._event.set)
+        else:
+            self._pending = True
+
+    def clear(self) -> None:
+        self._pending = False
+        if self._event:
+            self._event.clear()
+
+    async def wait(self) -> None:
+        if self._event is None:
+            self._loop = asyncio.get_running_loop()
+            self._event = asyncio.Event()
+        if self._pending:
+            self._pending = False
+            return
+
+        await self._event.wait()
+        self._event.clear()
+
+
+class _IOQueue:
+    # Yielded by tasks waiting for a socket, like uasyncio.core._io_queue
+    def queue_read(self, sock:Any) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def ready() -> None:
+            loop.remove_reader(sock.fileno())
+            if not future.done():
+                future.set_result(None)
+
+        loop.add_reader(sock.fileno(), ready)
+        future._asyncio_future_blocking = True
+        return future
+
+
+core = types.SimpleNamespace(_io_queue=_IOQueue())
@@ -0,0 +1,157 @@
+# Timing accuracy of PinPlus.modulate under HTTP load. The pins of the stand-in machine module record every transition
+# with a timestamp, which is compared with the schedule of the script
+from typing import Any, Dict, List, Tuple
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+
+# run puts the client and the scenarios on the path
+from run import HOST, Stats, start_server, worker
+from bitter_client import api  # noqa: I100
+from bitter_client.http import Connection, Request
+from scenarios import scenarios
+
+PIN = "led"
+
+# Reference scripts and the number of times each one is repeated
+scripts:Dict[str, Tuple[List[str], int]] = {
+    "blink": (["on", "delay 50", "off", "delay 50"], 20),
+    "pwm": (["on", "delay_us 2000", "off", "delay_us 8000"], 100),
+    "fast": (["on", "delay 1", "off", "delay 1"], 500),
+    "long": (["on", "delay 5", "off", "delay 5"], 400),
+}
+
+
+def schedule(script:List[str], times:int) -> List[Tuple[int, int]]:
+    # Offsets in microsecs from the first action of the transitions the script should cause, as (offset, level)
+    edges = []
+    offset = 0
+    level = 0
+    for _ in range(times):
+        for action in script:
+            if action in ("on", "off"):
+                if (new_level := 1 if action == "on" else 0) != level:
+                    edges.append((offset, new_level))
+                level = new_level
+            else:
+                name, amount = action.split(" ")
+                offset += int(amount) * (1000 if name == "delay" else 1)
+
+    return edges
+
+
+def percentile(values:List[float], fraction:float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def analyze(expected:List[Tuple[int, int]], recorded:List[Tuple[int, int, int]], late_us:int) -> Dict[str, Any]:
+    # The first transition sets the origin of the schedule, then each transition is compared with its scheduled time
+    # (error) and with the previous transition (jitter of the interval between both)
+    if len(recorded) != len(expected):
+        return {"error": f"{len(recorded)} transitions recorded, {len(expected)} expected"}
+
+    origin = recorded[0][0]
+    errors = [(timestamp - origin) / 1000 - offset for (timestamp, _, _), (offset, _) in zip(recorded, expected)]
+    jitter = sorted(abs(errors[i] - errors[i - 1]) for i in range(1, len(errors)))
+    return {
+        "edges": len(recorded),
+        "jitter_us": {
+            "p50": round(percentile(jitter, 0.50), 1),
+            "p99": round(percentile(jitter, 0.99), 1),
+            "max": round(jitter[-1] if jitter else 0.0, 1),
+        },
+        "max_error_us": round(max(abs(error) for error in errors), 1),
+        "drift_us": round(errors[-1], 1),
+        "late_edges": sum(1 for error in errors if error > late_us),
+    }
+
+
+async def request(port:int, *requests:Request) -> List[Any]:
+    connection = await Connection.open(HOST, port, 60.0)
+    try:
+        return [response.data() for response in await connection.exchange(list(requests), HOST, 60.0)]
+    finally:
+        connection.close()
+
+
+async def measure(port:int, script:List[str], times:int, load:int, late_us:int, seed:int) -> Dict[str, Any]:
+    # The load doesn't switch the measured pin, it would add transitions that aren't part of the schedule
+    load_mix = [(weight, request) for weight, request in scenarios["mixed"]
+                if request.method == "GET" or PIN not in request.path + json.dumps(request.body)]
+    mix = [request for _, request in load_mix]
+    weights = [weight for weight, _ in load_mix]
+    rng = random.Random(seed)
+    stats = Stats()
+
+    _, state, _ = await request(port, api.off(PIN), api.state(PIN), Request("POST", "/_bench/transitions"))
+    loop = asyncio.get_running_loop()
+    workers = [asyncio.create_task(worker(port, mix, weights, float("inf"), stats, rng)) for _ in range(load)]
+    try:
+        await asyncio.sleep(0.2)
+        start = loop.time()
+        reported, = await request(port, api.modulate(PIN, script, times, wait=True))
+        elapsed = loop.time() - start
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    recorded, = await request(port, Request("GET", "/_bench/transitions"))
+    pin_id = state["config"]["id"]
+    recorded = [tuple(transition) for transition in recorded if transition[1] == pin_id]
+    result = analyze(schedule(script, times), recorded, late_us)
+    result["missed_deadlines"] = reported.get("missed_deadlines")
+    result["reported"] = reported
+    result["load_rps"] = round(len(stats.latencies) / elapsed, 1)
+    return result
+
+
+async def run(args:argparse.Namespace) -> Dict[str, Any]:
+    server = await start_server(args.port)
+    try:
+        results = {
+            "runtime": f"{platform.python_implementation()} {platform.python_version()}",
+            "scenarios": {},
+        }
+        for i, name in enumerate(args.scripts):
+            script, times = scripts[name]
+            for load in args.loads:
+                results["scenarios"][f"{name}/load-{load}"] = await measure(args.port, script, times, load,
+                                                                            args.late_us, args.seed + i)
+        return results
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the timing accuracy of scripts under HTTP load")
+    parser.add_argument("scripts", nargs="*", metavar="SCRIPT", help=f"Default: all ({', '.join(scripts)})")
+    parser.add_argument("-l", "--loads", type=int, nargs="+", default=[0, 1, 3],
+                        help="Connections sending the mixed scenario while the scripts run, the server takes 4 "
+                             "connections at most and one of them runs the script")
+    parser.add_argument("--late-us", type=int, default=1000, help="Transitions later than this are counted as late")
+    parser.add_argument("--port", type=int, default=5181)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Write the results to this file instead of stdout")
+    args = parser.parse_args()
+
+    args.scripts = args.scripts or list(scripts)
+    if unknown := [name for name in args.scripts if name not in scripts]:
+        parser.error(f"unknown scripts: {', '.join(unknown)}")
+
+    results = asyncio.run(run(args))
+    output = json.dumps(results, indent=2) + "\n"
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+from . import api
+from .board import Board
+from .exceptions import BadRequest, BitterError, Conflict, NotFound, Unavailable
+from .fleet import Fleet
+from .http import ConnectError, Request, Response
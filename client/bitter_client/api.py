@@ -0,0 +1,88 @@
+from typing import Any, Dict, List, Optional
+
+from .http import Request
+
+# Builders of the requests of the board's HTTP API, one for each route. They are sent with Board.call or pipelined
+# with Board.pipeline and Fleet.run
+
+
+def _query(**params:Any) -> str:
+    query = "&".join(f"{key}={value}" for key, value in params.items() if value is not None)
+    return f"?{query}" if query else ""
+
+
+def state(pin:str) -> Request:
+    return Request("GET", f"/gpio/{pin}")
+
+
+def measure(pin:str) -> Request:
+    return Request("GET", f"/gpio/{pin}/measure")
+
+
+def on(pin:str) -> Request:
+    return Request("POST", f"/gpio/{pin}", {"cmd": "on"}, repeatable=True)
+
+
+def off(pin:str) -> Request:
+    return Request("POST", f"/gpio/{pin}", {"cmd": "off"}, repeatable=True)
+
+
+def modulate(pin:str, script:List[str], times:int=1, policy:str="replace", wait:bool=False) -> Request:
+    body = {"cmd": "modulate", "script": script, "times": times, "policy": policy}
+    return Request("POST", f"/gpio/{pin}" + _query(wait="true" if wait else None), body)
+
+
+def waveform(pin:str, timings:List[int], times:int=1, carrier:Optional[int]=None, duty:Optional[int]=None,
+             resolution:Optional[int]=None) -> Request:
+    body = {"cmd": "waveform", "timings": timings, "times": times}
+    options = {"carrier": carrier, "duty": duty, "resolution": resolution}
+    body.update((key, value) for key, value in options.items() if value is not None)
+    return Request("POST", f"/gpio/{pin}", body)
+
+
+def batch(commands:List[Dict[str, Any]], wait:bool=False) -> Request:
+    return Request("POST", "/gpio" + _query(wait="true" if wait else None), commands)
+
+
+def group_state(group:str) -> Request:
+    return Request("GET", f"/groups/{group}")
+
+
+def group_on(group:str) -> Request:
+    return Request("POST", f"/groups/{group}", {"cmd": "on"}, repeatable=True)
+
+
+def group_off(group:str) -> Request:
+    return Request("POST", f"/groups/{group}", {"cmd": "off"}, repeatable=True)
+
+
+def group_set(group:str, values:List[bool]) -> Request:
+    return Request("POST", f"/groups/{group}", {"cmd": "set", "value": values}, repeatable=True)
+
+
+def jobs() -> Request:
+    return Request("GET", "/jobs")
+
+
+def cancel_job(job_id:int) -> Request:
+    return Request("DELETE", f"/jobs/{job_id}")
+
+
+def sampler_state() -> Request:
+    return Request("GET", "/sampler")
+
+
+def sampler_start(pins:List[str], rate_hz:int, size:int=1024) -> Request:
+    return Request("POST", "/sampler", {"pins": pins, "rate_hz": rate_hz, "size": size})
+
+
+def sampler_stop() -> Request:
+    return Request("DELETE", "/sampler")
+
+
+def sampler_data(since:Optional[int]=None, encoding:str="raw") -> Request:
+    return Request("GET", "/sampler/data" + _query(since=since, encoding=encoding))
+
+
+def stats() -> Request:
+    return Request("GET", "/stats")
@@ -0,0 +1,143 @@
+from typing import Any, List, Optional
+
+import asyncio
+import random
+
+from . import api
+from .exceptions import BitterError, error
+from .http import ConnectError, Pool, Request, Response
+
+
+class Board:
+    # Requests are retried when the connection can't be opened and on 503 responses, the board answers 503 without
+    # running anything. Timeouts and connections lost mid-exchange are only retried for idempotent requests
+    retry_statuses = (503,)
+
+    def __init__(self, host:str, port:int=80, *, connections:int=2, retries:int=3, backoff:float=0.2,
+                 timeout:float=5.0):
+        self.host = host
+        self.port = port
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = Pool(host, port, connections, timeout)
+
+    async def __aenter__(self) -> "Board":
+        return self
+
+    async def __aexit__(self, *_exc_info:Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    async def call(self, request:Request) -> Any:
+        result = (await self.pipeline(request))[0]
+        if isinstance(result, BitterError):
+            raise result
+
+        return result
+
+    async def pipeline(self, *requests:Request) -> List[Any]:
+        # Returns the result of each request in order, failed requests are returned as their BitterError
+        responses = await self.exchange(list(requests))
+        return [self._result(response) for response in responses]
+
+    async def exchange(self, requests:List[Request]) -> List[Response]:
+        responses:List[Optional[Response]] = [None] * len(requests)
+        pending = list(range(len(requests)))
+        for attempt in range(self.retries + 1):
+            delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+            try:
+                answered = await self.pool.exchange([requests[i] for i in pending])
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as ex:
+                resend = isinstance(ex, ConnectError) or all(requests[i].idempotent for i in pending)
+                if attempt == self.retries or not resend:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            retry = []
+            for i, response in zip(pending, answered):
+                responses[i] = response
+                if response.status in self.retry_statuses:
+                    retry.append(i)
+                    if "retry-after" in response.headers:
+                        delay = max(delay, float(response.headers["retry-after"]))
+
+            if not (pending := retry) or attempt == self.retries:
+                break
+            await asyncio.sleep(delay)
+
+        return responses
+
+    @staticmethod
+    def _result(response:Response) -> Any:
+        if response.status >= 400:
+            data = response.data()
+            message = data.get("error") if isinstance(data, dict) else None
+            return error(response.status, message or f"HTTP {response.status}")
+
+        return response.data()
+
+    async def state(self, pin:str) -> Any:
+        return await self.call(api.state(pin))
+
+    async def measure(self, pin:str) -> Any:
+        return await self.call(api.measure(pin))
+
+    async def on(self, pin:str) -> None:
+        await self.call(api.on(pin))
+
+    async def off(self, pin:str) -> None:
+        await self.call(api.off(pin))
+
+    async def modulate(self, pin:str, script:List[str], times:int=1, policy:str="replace", wait:bool=False) -> Any:
+        return await self.call(api.modulate(pin, script, times, policy, wait))
+
+    async def waveform(self, pin:str, timings:List[int], times:int=1, **options:int) -> None:
+        await self.call(api.waveform(pin, timings, times, **options))
+
+    async def batch(self, commands:List[Any], wait:bool=False) -> List[Any]:
+        return await self.call(api.batch(commands, wait))
+
+    async def group_state(self, group:str) -> Any:
+        return await self.call(api.group_state(group))
+
+    async def group_on(self, group:str) -> None:
+        await self.call(api.group_on(group))
+
+    async def group_off(self, group:str) -> None:
+        await self.call(api.group_off(group))
+
+    async def group_set(self, group:str, values:List[bool]) -> None:
+        await self.call(api.group_set(group, values))
+
+    async def jobs(self) -> List[Any]:
+        return await self.call(api.jobs())
+
+    async def cancel_job(self, job_id:int) -> None:
+        await self.call(api.cancel_job(job_id))
+
+    async def sampler_state(self) -> Any:
+        return await self.call(api.sampler_state())
+
+    async def sampler_start(self, pins:List[str], rate_hz:int, size:int=1024) -> Any:
+        return await self.call(api.sampler_start(pins, rate_hz, size))
+
+    async def sampler_stop(self) -> None:
+        await self.call(api.sampler_stop())
+
+    async def sampler_data(self, since:Optional[int]=None, encoding:str="raw") -> Any:
+        response = (await self.exchange([api.sampler_data(since, encoding)]))[0]
+        if isinstance(result := self._result(response), BitterError):
+            raise result
+
+        return {
+            "seq": int(response.headers["x-sampler-seq"]),
+            "count": int(response.headers["x-sampler-count"]),
+            "width": int(response.headers["x-sampler-width"]),
+            "data": response.body,
+        }
+
+    async def stats(self) -> Any:
+        return await self.call(api.stats())
@@ -0,0 +1,107 @@
+from typing import Any, List, Optional
+
+import argparse
+import asyncio
+import json
+import sys
+
+from . import api
+from .exceptions import BitterError
+from .fleet import Fleet
+from .http import Request
+
+
+def parse_args(argv:Optional[List[str]]=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="bitter", description="Send commands to one or many boards at once")
+    parser.add_argument("-H", "--host", action="append", default=[], dest="hosts",
+                        help="Board address as HOST or HOST:PORT, can be repeated")
+    parser.add_argument("-f", "--hosts-file", help="File with one board address per line")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Boards contacted at the same time")
+    parser.add_argument("--connections", type=int, default=2, help="Connections kept open to each board")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Retries on connection errors and 503 responses, timeouts only for idempotent requests")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Timeout of each request in seconds")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("state", "on", "off", "measure"):
+        command = commands.add_parser(name, help=f"{name} of each pin, pipelined on the same connection")
+        command.add_argument("pins", nargs="+", metavar="PIN")
+
+    command = commands.add_parser("modulate", help="Run a script in a pin")
+    command.add_argument("pin", metavar="PIN")
+    command.add_argument("script", nargs="+", metavar="ACTION", help='e.g. on "delay 100" off "delay 100"')
+    command.add_argument("--times", type=int, default=1)
+    command.add_argument("--policy", choices=("replace", "queue", "reject"), default="replace")
+    command.add_argument("--wait", action="store_true", help="Respond after the script finished")
+
+    command = commands.add_parser("group", help="Get or switch the pins of a group")
+    command.add_argument("action", choices=("state", "on", "off"))
+    command.add_argument("groups", nargs="+", metavar="GROUP")
+
+    command = commands.add_parser("batch", help="Send the commands in a json file, as in POST /gpio")
+    command.add_argument("file", type=argparse.FileType())
+    command.add_argument("--wait", action="store_true", help="Respond after the scripts finished")
+
+    commands.add_parser("jobs", help="List the jobs")
+    command = commands.add_parser("cancel", help="Cancel jobs")
+    command.add_argument("job_ids", nargs="+", type=int, metavar="JOB_ID")
+    commands.add_parser("stats", help="Get the connection stats")
+
+    args = parser.parse_args(argv)
+    if args.hosts_file:
+        with open(args.hosts_file) as fh:
+            args.hosts += [line.strip() for line in fh if line.strip() and not line.startswith("#")]
+    if not args.hosts:
+        parser.error("at least one board is required, use --host or --hosts-file")
+
+    return args
+
+
+def build_requests(args:argparse.Namespace) -> List[Request]:
+    if args.command in ("state", "on", "off", "measure"):
+        return [getattr(api, args.command)(pin) for pin in args.pins]
+
+    if args.command == "modulate":
+        return [api.modulate(args.pin, args.script, args.times, args.policy, args.wait)]
+
+    if args.command == "group":
+        return [getattr(api, f"group_{args.action}")(group) for group in args.groups]
+
+    if args.command == "batch":
+        return [api.batch(json.load(args.file), args.wait)]
+
+    if args.command == "jobs":
+        return [api.jobs()]
+
+    if args.command == "cancel":
+        return [api.cancel_job(job_id) for job_id in args.job_ids]
+
+    return [api.stats()]
+
+
+def _output(result:Any) -> Any:
+    if isinstance(result, BaseException):
+        return {"error": str(result) or type(result).__name__}
+
+    if isinstance(result, list):
+        return [_output(item) for item in result]
+
+    return result
+
+
+async def run(args:argparse.Namespace) -> int:
+    requests = build_requests(args)
+    async with Fleet(args.hosts, concurrency=args.concurrency, connections=args.connections, retries=args.retries,
+                     timeout=args.timeout) as fleet:
+        results = await fleet.run(*requests)
+
+    json.dump({host: _output(result) for host, result in results.items()}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+    failed = any(isinstance(result, BaseException) or any(isinstance(item, BitterError) for item in result)
+                 for result in results.values())
+    return 1 if failed else 0
+
+
+def main(argv:Optional[List[str]]=None) -> None:
+    sys.exit(asyncio.run(run(parse_args(argv))))
@@ -0,0 +1,24 @@
+from typing import Dict, Type
+
+
+class BitterError(Exception):
+    def __init__(self, status:int, message:str):
+        super().__init__(message)
+        self.status = status
+
+
+class BadRequest(BitterError): pass
+class NotFound(BitterError): pass
+class Conflict(BitterError): pass
+class Unavailable(BitterError): pass
+
+errors:Dict[int, Type[BitterError]] = {
+    400: BadRequest,
+    404: NotFound,
+    409: Conflict,
+    503: Unavailable,
+}
+
+
+def error(status:int, message:str) -> BitterError:
+    return errors.get(status, BitterError)(status, message)
@@ -0,0 +1,38 @@
+from typing import Any, Dict, Iterable
+
+import asyncio
+
+from .board import Board
+from .http import Request
+
+
+class Fleet:
+    def __init__(self, hosts:Iterable[str], *, concurrency:int=16, **board_options:Any):
+        self.boards:Dict[str, Board] = {host: Board(*self._address(host), **board_options) for host in hosts}
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def __aenter__(self) -> "Fleet":
+        return self
+
+    async def __aexit__(self, *_exc_info:Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for board in self.boards.values():
+            board.close()
+
+    async def run(self, *requests:Request) -> Dict[str, Any]:
+        # Sends the requests to every board at once, pipelined on a connection of each board. The result of each board
+        # is the list of results of its requests, or the exception if it couldn't be reached
+        results = await asyncio.gather(*(self._run(board, requests) for board in self.boards.values()),
+                                       return_exceptions=True)
+        return dict(zip(self.boards, results))
+
+    async def _run(self, board:Board, requests:Iterable[Request]) -> Any:
+        async with self.semaphore:
+            return await board.pipeline(*requests)
+
+    @staticmethod
+    def _address(host:str) -> tuple:
+        name, _, port = host.partition(":")
+        return (name, int(port)) if port else (name,)
@@ -0,0 +1,155 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import asyncio
+import json
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+
+
+class ConnectError(ConnectionError):
+    pass
+
+
+class Request(NamedTuple):
+    method:str
+    path:str
+    body:Any = None
+    # POSTs that leave the board in the same state when they run twice, like on and off
+    repeatable:bool = False
+
+    @property
+    def idempotent(self) -> bool:
+        return self.repeatable or self.method in IDEMPOTENT_METHODS
+
+
+class Response(NamedTuple):
+    status:int
+    headers:Dict[str, str]
+    body:bytes
+
+    def data(self) -> Any:
+        if self.headers.get("content-type", "").startswith("application/json") and self.body:
+            return json.loads(self.body)
+
+        return self.body or None
+
+
+class Connection:
+    def __init__(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.reusable = True
+        self.used = False
+
+    @classmethod
+    async def open(cls, host:str, port:int, timeout:float) -> "Connection":
+        # Raised apart from the errors of an exchange, nothing was sent so any request can be sent again
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError) as ex:
+            raise ConnectError(f"Can't connect to {host}:{port}: {ex!r}") from ex
+
+        return cls(reader, writer)
+
+    async def exchange(self, requests:List[Request], host:str, timeout:float) -> List[Response]:
+        # All the requests are written at once and the responses read in order. The board can close the connection
+        # before answering all of them, the requests left unanswered have to be sent again
+        self.writer.write(b"".join(self._encode(request, host) for request in requests))
+        await self.writer.drain()
+
+        responses = []
+        for _ in requests:
+            response = await asyncio.wait_for(self._read_response(), timeout)
+            if response is None:
+                break
+
+            responses.append(response)
+            if response.headers.get("connection", "").lower() == "close":
+                break
+
+        self.reusable = len(responses) == len(requests) and \
+            responses[-1].headers.get("connection", "").lower() != "close"
+        self.used = True
+        return responses
+
+    def close(self) -> None:
+        self.reusable = False
+        self.writer.close()
+
+    @staticmethod
+    def _encode(request:Request, host:str) -> bytes:
+        headers = f"{request.method} {request.path} HTTP/1.1\r\nHost: {host}\r\n"
+        if request.body is None:
+            return f"{headers}\r\n".encode()
+
+        body = json.dumps(request.body).encode()
+        headers += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+        return headers.encode() + body
+
+    async def _read_response(self) -> Optional[Response]:
+        status_line = await self.reader.readline()
+        if not status_line:
+            return None
+
+        status = int(status_line.split(b" ", 2)[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+            name, value = line.decode().split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in headers:
+            body = await self.reader.readexactly(int(headers["content-length"]))
+        elif status in (204, 304):
+            body = b""
+        else:
+            # Streamed bodies have no length and end when the board closes the connection
+            body = await self.reader.read()
+            headers["connection"] = "close"
+
+        return Response(status, headers, body)
+
+
+class Pool:
+    def __init__(self, host:str, port:int, size:int, timeout:float):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle:List[Connection] = []
+        self.semaphore = asyncio.Semaphore(size)
+
+    async def exchange(self, requests:List[Request]) -> List[Response]:
+        async with self.semaphore:
+            responses:List[Response] = []
+            while len(responses) < len(requests):
+                connection = self.idle.pop() if self.idle else await Connection.open(self.host, self.port, self.timeout)
+                reused = connection.used
+                try:
+                    answered = await connection.exchange(requests[len(responses):], self.host, self.timeout)
+                except asyncio.TimeoutError:
+                    # The board may still be running the requests, they are only resent by Board if idempotent
+                    connection.close()
+                    raise
+                except (OSError, asyncio.IncompleteReadError):
+                    connection.close()
+                    if reused and not responses:
+                        # The board closed the idle connection, it doesn't count as a failed attempt
+                        continue
+                    raise
+
+                if connection.reusable:
+                    self.idle.append(connection)
+                else:
+                    connection.close()
+
+                if not answered:
+                    if reused:
+                        continue
+                    raise ConnectionError(f"{self.host} closed the connection without answering")
+
+                responses.extend(answered)
+
+            return responses
+
+    def close(self) -> None:
+        while self.idle:
+            self.idle.pop().close()
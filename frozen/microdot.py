@@ -97,6 +97,9 @@ def urlencode(s):
             '&', '%26').replace('=', '%3D')
 
 
+_missing = object()
+
+
 class NoCaseDict(dict):
     """A subclass of dictionary that holds case-insensitive keys.
 
@@ -138,13 +141,86 @@ class NoCaseDict(dict):
 
     def __contains__(self, key):
         kl = key.lower()
-        return self.keymap.get(kl, kl) in self.keys()
+        return super().get(self.keymap.get(kl, kl), _missing) is not _missing
 
     def get(self, key, default=None):
         kl = key.lower()
         return super().get(self.keymap.get(kl, kl), default)
 
 
+class LazyHeaders(NoCaseDict):
+    """A :class:`NoCaseDict <microdot.NoCaseDict>` that can also hold raw
+    header lines, which are only parsed the first time a key that is not in
+    the dictionary is looked up or the contents of the dictionary are listed.
+
+    :param initial_dict: an initial dictionary of key/value pairs to
+                         initialize this object with.
+    :param parsed: the lowercase names of the headers that are never held as
+                   raw lines. Looking up one of them that is not in the
+                   dictionary does not parse the raw lines, since it was not
+                   sent.
+    """
+    def __init__(self, initial_dict=None, parsed=()):
+        #: The header lines that have not been parsed yet, as bytes or
+        #: memoryviews.
+        self.deferred = []
+        self.parsed = parsed
+        super().__init__(initial_dict)
+
+    def parse(self):
+        """Parse the deferred header lines into the dictionary."""
+        if not self.deferred:
+            return
+        deferred = self.deferred
+        self.deferred = []
+        for line in deferred:
+            line = str(line, 'utf-8').strip()
+            if ':' in line:
+                header, value = line.split(':', 1)
+                self[header] = value.strip()
+
+    def _has(self, key):
+        if super().__contains__(key):
+            return True
+        if not self.deferred or key.lower() in self.parsed:
+            return False
+        self.parse()
+        return super().__contains__(key)
+
+    def __getitem__(self, key):
+        self._has(key)
+        return super().__getitem__(key)
+
+    def __delitem__(self, key):
+        self._has(key)
+        super().__delitem__(key)
+
+    def __contains__(self, key):
+        return self._has(key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        self._has(key)
+        return super().get(key, default)
+
+    def keys(self):
+        self.parse()
+        return super().keys()
+
+    def values(self):
+        self.parse()
+        return super().values()
+
+    def items(self):
+        self.parse()
+        return super().items()
+
+
 class MultiDict(dict):
     """A subclass of dictionary that can hold multiple values for the same
     key. It is used to hold key/value pairs decoded from query strings and
@@ -267,6 +343,22 @@ class Request():
     #:    Request.max_readline = 16 * 1024  # 16KB lines allowed
     max_readline = 2 * 1024
 
+    #: Specify the names of the headers that are parsed when the request is
+    #: created, in addition to the ones listed in ``required_headers``. The
+    #: remaining header lines are stored unparsed and only decoded if a
+    #: handler looks up a header that was not parsed. The default of ``None``
+    #: parses all the headers.
+    #:
+    #: Example::
+    #:
+    #:    Request.header_allowlist = ('Authorization',)
+    header_allowlist = None
+
+    #: The headers the framework needs, which are always parsed when
+    #: ``header_allowlist`` is set.
+    required_headers = ('Content-Length', 'Content-Type', 'Connection',
+                        'If-None-Match')
+
     class G:
         pass
 
@@ -289,8 +381,6 @@ class Request():
         self.args = {}
         #: A dictionary with the headers included in the request.
         self.headers = headers
-        #: A dictionary with the cookies included in the request.
-        self.cookies = {}
         #: The parsed ``Content-Length`` header.
         self.content_length = 0
         #: The parsed ``Content-Type`` header.
@@ -308,11 +398,8 @@ class Request():
             self.content_length = int(self.headers['Content-Length'])
         if 'Content-Type' in self.headers:
             self.content_type = self.headers['Content-Type']
-        if 'Cookie' in self.headers:
-            for cookie in self.headers['Cookie'].split(';'):
-                name, value = cookie.strip().split('=', 1)
-                self.cookies[name] = value
 
+        self._cookies = None
         self._body = body
         self.body_used = False
         self._stream = stream
@@ -386,6 +473,17 @@ class Request():
                 self.body_used = True
         return self._body
 
+    @property
+    def cookies(self):
+        """A dictionary with the cookies included in the request."""
+        if self._cookies is None:
+            self._cookies = {}
+            if 'Cookie' in self.headers:
+                for cookie in self.headers['Cookie'].split(';'):
+                    name, value = cookie.strip().split('=', 1)
+                    self._cookies[name] = value
+        return self._cookies
+
     @property
     def stream(self):
         """The input stream, containing the request body."""
@@ -451,6 +549,97 @@ class Request():
         return line
 
 
+class JSONStream():
+    """A JSON encoder that produces a document in small chunks.
+
+    The document is encoded piece by piece into a buffer that is reused for
+    every chunk, so the complete document is never held in memory. Each chunk
+    is only valid until the next one is requested.
+
+    :param obj: The dictionary or list to encode.
+    """
+    #: The size of the buffer used to encode the document, which is the size
+    #: of the chunks returned when iterating.
+    buffer_size = 256
+
+    def __init__(self, obj):
+        self.obj = obj
+        self.buffer = bytearray(self.buffer_size)
+        self.length = None
+        self.small = None
+        self.chunks = None
+
+    def __len__(self):
+        # the length is computed with a dry run of the encoder, documents that
+        # fit in the buffer are left there and sent as a single piece
+        if self.length is None:
+            length = 0
+            for chunk in self._chunks():
+                length += len(chunk)
+            if length <= len(self.buffer):
+                self.small = bytes(memoryview(self.buffer)[:length])
+            self.length = length
+        return self.length
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.chunks is None:
+            self.chunks = iter((self.small,)) if self.small is not None \
+                else self._chunks()
+        return next(self.chunks)
+
+    def _chunks(self):
+        buffer = self.buffer
+        mv = memoryview(buffer)
+        size = len(buffer)
+        n = 0
+        for token in self._tokens(self.obj):
+            length = len(token)
+            if n + length <= size:
+                buffer[n:n + length] = token
+                n += length
+                continue
+            token = memoryview(token)
+            i = 0
+            while i < length:
+                k = min(size - n, length - i)
+                mv[n:n + k] = token[i:i + k]
+                n += k
+                i += k
+                if n == size:
+                    yield mv
+                    n = 0
+        if n:
+            yield mv[:n]
+
+    def _tokens(self, obj):
+        if isinstance(obj, dict):
+            yield b'{'
+            first = True
+            for key, value in obj.items():
+                if not first:
+                    yield b', '
+                first = False
+                yield json.dumps(key if isinstance(key, str)
+                                 else str(key)).encode()
+                yield b': '
+                yield from self._tokens(value)
+            yield b'}'
+        elif isinstance(obj, (list, tuple)):
+            yield b'['
+            first = True
+            for value in obj:
+                if not first:
+                    yield b', '
+                first = False
+                yield from self._tokens(value)
+            yield b']'
+        else:
+            yield json.dumps(obj).encode()
+
+
 class Response():
     """An HTTP response class.
 
@@ -494,7 +683,9 @@ class Response():
         self.headers = NoCaseDict(headers or {})
         self.reason = reason
         if isinstance(body, (dict, list)):
-            self.body = json.dumps(body).encode()
+            self.body = JSONStream(body)
+            # encoding errors surface here instead of halfway through writing
+            len(self.body)
             self.headers['Content-Type'] = 'application/json; charset=UTF-8'
         elif isinstance(body, str):
             self.body = body.encode()
@@ -539,7 +730,7 @@ class Response():
             self.headers['Set-Cookie'] = [http_cookie]
 
     def complete(self):
-        if isinstance(self.body, bytes) and \
+        if isinstance(self.body, (bytes, JSONStream)) and \
                 'Content-Length' not in self.headers:
             self.headers['Content-Length'] = str(len(self.body))
         if 'Content-Type' not in self.headers:
@@ -638,6 +829,12 @@ class URLPattern():
         self.url_pattern = url_pattern
         self.pattern = ''
         self.args = []
+        #: The parsed path segments, a string for static segments or a
+        #: ``(type, name)`` tuple for dynamic ones.
+        self.segments = []
+        #: ``False`` if the pattern has segments that can match more than
+        #: one path segment, which the route index cannot handle.
+        self.indexable = True
         use_regex = False
         for segment in url_pattern.lstrip('/').split('/'):
             if segment and segment[0] == '<':
@@ -662,8 +859,13 @@ class URLPattern():
                 use_regex = True
                 self.pattern += '/({pattern})'.format(pattern=pattern)
                 self.args.append({'type': type_, 'name': name})
+                if type_ in ('string', 'int'):
+                    self.segments.append((type_, name))
+                else:
+                    self.indexable = False
             else:
                 self.pattern += '/{segment}'.format(segment=segment)
+                self.segments.append(segment)
         if use_regex:
             self.pattern = re.compile('^' + self.pattern + '$')
 
@@ -711,6 +913,7 @@ class Microdot():
 
     def __init__(self):
         self.url_map = []
+        self.route_index = None
         self.before_request_handlers = []
         self.after_request_handlers = []
         self.error_handlers = {}
@@ -751,6 +954,7 @@ class Microdot():
         def decorated(f):
             self.url_map.append(
                 (methods or ['GET'], URLPattern(url_pattern), f))
+            self.route_index = None
             return f
         return decorated
 
@@ -910,6 +1114,7 @@ class Microdot():
             self.url_map.append(
                 (methods, URLPattern(url_prefix + pattern.url_pattern),
                  handler))
+        self.route_index = None
         for handler in subapp.before_request_handlers:
             self.before_request_handlers.append(handler)
         for handler in subapp.after_request_handlers:
@@ -1016,16 +1221,106 @@ class Microdot():
         self.shutdown_requested = True
 
     def find_route(self, req):
-        f = 404
-        for route_methods, route_pattern, route_handler in self.url_map:
-            req.url_args = route_pattern.match(req.path)
-            if req.url_args is not None:
-                if req.method in route_methods:
-                    f = route_handler
+        if self.route_index is None:
+            self.build_route_index()
+        static, tree, fallback = self.route_index
+
+        # candidate routes are compared by their position in the URL map, so
+        # the index resolves to the same route the URL map order would
+        best = None
+        matched = False
+        table = static.get(req.path)
+        if table is not None:
+            matched = True
+            best = table.get(req.method)
+        if req.path[:1] == '/' and (tree[0] or tree[1]):
+            found = []
+            self._match_route_tree(tree, req.path[1:].split('/'), 0, [],
+                                   found)
+            for table, args in found:
+                matched = True
+                route = table.get(req.method)
+                if route and (best is None or route[0] < best[0]):
+                    best = (route[0], route[1], args)
+        for order, methods, pattern, handler in fallback:
+            if best is not None and order > best[0]:
+                break
+            args = pattern.match(req.path)
+            if args is not None:
+                matched = True
+                if req.method in methods:
+                    best = (order, handler, args)
                     break
-                else:
-                    f = 405
-        return f
+
+        if best is None:
+            req.url_args = None
+            return 405 if matched else 404
+        req.url_args = dict(best[2]) if len(best) > 2 else {}
+        return best[1]
+
+    def build_route_index(self):
+        """Build the lookup structures used by :func:`find_route`. This
+        method is invoked automatically the first time a request is routed
+        after the URL map changes.
+
+        Static paths are stored in a dictionary, and paths with ``string``
+        or ``int`` arguments in a tree with one level per path segment. Each
+        entry holds a table that maps HTTP methods to handlers. Patterns with
+        ``path`` or ``re`` arguments are matched with their regular
+        expressions.
+        """
+        static = {}
+        tree = [{}, [], None]  # static children, dynamic children, methods
+        fallback = []
+        for order, (methods, pattern, handler) in enumerate(self.url_map):
+            if not pattern.indexable:
+                fallback.append((order, methods, pattern, handler))
+                continue
+            if isinstance(pattern.pattern, str):
+                table = static.setdefault(pattern.pattern, {})
+            else:
+                node = tree
+                for segment in pattern.segments:
+                    if isinstance(segment, str):
+                        node = node[0].setdefault(segment, [{}, [], None])
+                        continue
+                    for arg, child in node[1]:
+                        if arg == segment:
+                            node = child
+                            break
+                    else:
+                        child = [{}, [], None]
+                        node[1].append((segment, child))
+                        node = child
+                if node[2] is None:
+                    node[2] = {}
+                table = node[2]
+            for method in methods:
+                if method not in table:
+                    table[method] = (order, handler)
+        self.route_index = (static, tree, fallback)
+
+    def _match_route_tree(self, node, segments, i, args, found):
+        if i == len(segments):
+            if node[2] is not None:
+                found.append((node[2], args[:]))
+            return
+        segment = segments[i]
+        child = node[0].get(segment)
+        if child is not None:
+            self._match_route_tree(child, segments, i + 1, args, found)
+        if not segment:
+            return
+        for (type_, name), child in node[1]:
+            if type_ == 'int':
+                if not segment.isdigit():
+                    continue
+                value = int(segment)
+            else:
+                value = segment
+            args.append((name, value))
+            self._match_route_tree(child, segments, i + 1, args, found)
+            args.pop()
 
     def handle_request(self, sock, addr):
         if not hasattr(sock, 'readline'):  # pragma: no cover
@@ -16,8 +16,15 @@ try:
 except ImportError:
     import io
 
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+import gc
+
 from microdot import Microdot as BaseMicrodot
-from microdot import NoCaseDict
+from microdot import NoCaseDict, LazyHeaders
 from microdot import Request as BaseRequest
 from microdot import Response as BaseResponse
 from microdot import print_exception
@@ -29,6 +36,200 @@ def _iscoroutine(coro):
     return hasattr(coro, 'send') and hasattr(coro, 'throw')
 
 
+_bytearray_find = hasattr(bytearray, 'find')
+
+
+def _find(buffer, byte, start, end):
+    # only used on short spans, lines are scanned by _BufferedReader
+    for i in range(start, end):
+        if buffer[i] == byte:
+            return i
+    return -1
+
+
+if _bytearray_find:  # pragma: no cover
+    def _find(buffer, byte, start, end):  # noqa: F811
+        return buffer.find(byte, start, end)
+
+
+def _put(buffer, n, data):
+    # copies data into buffer at offset n, returns the new offset or -1 once
+    # the buffer is full
+    if n < 0 or n + len(data) > len(buffer):
+        return -1
+    buffer[n:n + len(data)] = data
+    return n + len(data)
+
+
+class BufferPool():
+    """A fixed number of preallocated buffers that requests are read into.
+
+    :param count: The number of buffers in the pool.
+    :param size: The size of each buffer, in bytes. Lines longer than this,
+                 up to ``Request.max_readline``, are read into a larger
+                 buffer allocated for the request.
+    """
+    def __init__(self, count, size):
+        self.count = count
+        self.size = size
+        self.buffers = [bytearray(size) for _ in range(count)]
+
+    def acquire(self):
+        """Take a buffer from the pool. When all the buffers are in use a new
+        one is allocated."""
+        if self.buffers:
+            return self.buffers.pop()
+        return bytearray(self.size)
+
+    def release(self, buffer):
+        """Return a buffer to the pool."""
+        if len(self.buffers) < self.count:
+            self.buffers.append(buffer)
+
+
+class _BufferedReader:
+    def __init__(self, stream, pool):
+        self.stream = stream
+        self.pool = pool
+        self.buffer = None
+        self.mv = None
+        # unread data is in buffer[start:end]
+        self.start = 0
+        self.end = 0
+        # memoryviews into the buffer that must survive a compaction
+        self.pinned = []
+        # offsets of the line ends in the buffer, where bytearray has no find
+        self.eols = []
+
+    def begin(self):
+        # views into the buffer held by the previous request are dropped
+        self.pinned.clear()
+        self.pinned = []
+        if self.buffer is None:
+            self.buffer = self.pool.acquire()
+            self.mv = memoryview(self.buffer)
+        elif self.start:
+            self._compact()
+
+    def release(self, force=False):
+        # buffers holding pipelined requests are kept until they are parsed
+        self.pinned.clear()
+        if self.buffer is not None and (force or self.start == self.end):
+            if len(self.buffer) == self.pool.size:
+                self.pool.release(self.buffer)
+            self.buffer = self.mv = None
+            self.start = self.end = 0
+            self.eols = []
+
+    def _compact(self):
+        for i, view in enumerate(self.pinned):
+            self.pinned[i] = bytes(view)
+        n = self.end - self.start
+        if n:
+            self.buffer[:n] = self.buffer[self.start:self.end]
+        self.eols = [i - self.start for i in self.eols if i >= self.start]
+        self.start = 0
+        self.end = n
+
+    def _grow(self):
+        # a line longer than the pooled buffers is read into a buffer of its
+        # own, pinned views keep the old one alive and still valid
+        buffer = bytearray(Request.max_readline + 2)
+        buffer[:self.end] = self.mv[:self.end]
+        self.buffer = buffer
+        self.mv = memoryview(buffer)
+
+    async def _readinto(self, view):
+        if hasattr(self.stream, 'readinto'):
+            return await self.stream.readinto(view) or 0
+        data = await self.stream.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    async def _fill(self):
+        if _bytearray_find:
+            n = await self._readinto(self.mv[self.end:])
+        else:
+            # the line ends are found in the chunk as read, with the find of
+            # bytes instead of a loop per byte over the buffer
+            data = await self.stream.read(len(self.buffer) - self.end)
+            n = len(data)
+            self.mv[self.end:self.end + n] = data
+            i = data.find(b'\n')
+            while i != -1:
+                self.eols.append(self.end + i)
+                i = data.find(b'\n', i + 1)
+        self.end += n
+        return n
+
+    def _find_eol(self, start):
+        if _bytearray_find:
+            return self.buffer.find(b'\n', start, self.end)
+        eols = self.eols
+        while eols and eols[0] < start:
+            eols.pop(0)
+        return eols[0] if eols else -1
+
+    async def readline_span(self):
+        # returns the offsets of the next line in the buffer, without the
+        # line terminator
+        scan = self.start
+        while True:
+            i = self._find_eol(scan)
+            if i != -1:
+                start = self.start
+                self.start = i + 1
+                if i > start and self.buffer[i - 1] == 13:
+                    i -= 1
+                if i - start > Request.max_readline:
+                    raise ValueError('line too long')
+                return start, i
+            if self.end == len(self.buffer):
+                if self.start:
+                    self._compact()
+                elif self.end < Request.max_readline + 2:
+                    self._grow()
+                else:
+                    raise ValueError('line too long')
+            scan = self.end
+            if not await self._fill():
+                start = self.start
+                self.start = self.end
+                return start, self.end
+
+    async def readexactly(self, n):
+        if len(self.buffer) - self.start < n <= len(self.buffer):
+            self._compact()
+        if n <= len(self.buffer) - self.start:
+            while self.end - self.start < n:
+                if not await self._fill():
+                    raise EOFError()
+            self.start += n
+            return self.mv[self.start - n:self.start]
+
+        # too large for the buffer
+        data = bytearray(n)
+        view = memoryview(data)
+        k = self.end - self.start
+        view[:k] = self.mv[self.start:self.end]
+        self.start = self.end
+        while k < n:
+            read = await self._readinto(view[k:])
+            if not read:
+                raise EOFError()
+            k += read
+        return data
+
+    async def read(self, n=-1):
+        if self.start < self.end:
+            k = self.end - self.start
+            if 0 <= n < k:
+                k = n
+            self.start += k
+            return bytes(self.mv[self.start - k:self.start])
+        return await self.stream.read(n)
+
+
 class _AsyncBytesIO:
     def __init__(self, data):
         self.stream = io.BytesIO(data)
@@ -53,6 +254,13 @@ class _AsyncBytesIO:
 
 
 class Request(BaseRequest):
+    _allowed = None
+
+    #: Whether the connection of the request became long-lived, a streamed
+    #: response or an upgraded connection, which doesn't count towards
+    #: ``max_connections``.
+    long_lived = False
+
     @staticmethod
     async def create(app, client_reader, client_writer, client_addr):
         """Create a request object.
@@ -67,52 +275,113 @@ class Request(BaseRequest):
         This method is a coroutine. It returns a newly created ``Request``
         object.
         """
-        # request line
-        line = (await Request._safe_readline(client_reader)).strip().decode()
+        if not isinstance(client_reader, _BufferedReader):
+            client_reader = _BufferedReader(
+                client_reader, BufferPool(0, app.buffer_size))
+        reader = client_reader
+        reader.begin()
+
+        # request line, the buffer can be replaced by a larger one while a
+        # line is read
+        start, end = await reader.readline_span()
+        mv = reader.mv
+        line = str(mv[start:end], 'utf-8').strip()
         if not line:
             return None
         method, url, http_version = line.split()
         http_version = http_version.split('/', 1)[1]
 
         # headers
-        headers = NoCaseDict()
+        allowed = Request._allowed_headers()
+        headers = NoCaseDict() if allowed is None else \
+            LazyHeaders(parsed=allowed[3])
+        if allowed is not None:
+            reader.pinned = headers.deferred
         content_length = 0
         while True:
-            line = (await Request._safe_readline(
-                client_reader)).strip().decode()
-            if line == '':
+            start, end = await reader.readline_span()
+            if start == end:
                 break
-            header, value = line.split(':', 1)
-            value = value.strip()
+            mv = reader.mv
+            if allowed is not None:
+                # only the allowed headers are decoded, the colon is looked
+                # for up to the length of the longest allowed name, and the
+                # name length is checked first to avoid copying most of the
+                # other ones
+                i = _find(reader.buffer, 58, start,
+                          min(end, start + allowed[4] + 1))
+                name = bytes(mv[start:i]).lower() \
+                    if i - start in allowed[1] else None
+                if name not in allowed[0]:
+                    headers.deferred.append(mv[start:end])
+                    continue
+                header = str(mv[start:i], 'utf-8')
+                value = str(mv[i + 1:end], 'utf-8').strip()
+            else:
+                line = str(mv[start:end], 'utf-8')
+                i = line.find(':')
+                if i == -1:
+                    raise ValueError('invalid header')
+                header = line[:i]
+                value = line[i + 1:].strip()
             headers[header] = value
             if header.lower() == 'content-length':
                 content_length = int(value)
 
         # body
-        body = b''
         if content_length and content_length <= Request.max_body_length:
-            body = await client_reader.readexactly(content_length)
+            body = await reader.readexactly(content_length)
             stream = None
         else:
             body = b''
-            stream = client_reader
+            stream = reader
 
         return Request(app, client_addr, method, url, http_version, headers,
                        body=body, stream=stream,
-                       sock=(client_reader, client_writer))
+                       sock=(reader, client_writer))
+
+    @property
+    def body(self):
+        # the body can be a view into the buffer the request was read into
+        if not isinstance(self._body, bytes):
+            self._body = bytes(self._body)
+        return self._body
+
+    @property
+    def json(self):
+        if self._json is None:
+            if self.content_type is None:
+                return None
+            mime_type = self.content_type.split(';')[0]
+            if mime_type != 'application/json':
+                return None
+            try:
+                self._json = json.loads(self._body)
+            except TypeError:  # pragma: no cover
+                # CPython can't parse JSON from a memoryview
+                self._json = json.loads(bytes(self._body))
+        return self._json
 
     @property
     def stream(self):
         if self._stream is None:
-            self._stream = _AsyncBytesIO(self._body)
+            self._stream = _AsyncBytesIO(self.body)
         return self._stream
 
     @staticmethod
-    async def _safe_readline(stream):
-        line = (await stream.readline())
-        if len(line) > Request.max_readline:
-            raise ValueError('line too long')
-        return line
+    def _allowed_headers():
+        if Request.header_allowlist is None:
+            return None
+        if Request._allowed is None or \
+                Request._allowed[2] is not Request.header_allowlist:
+            parsed = set(name.lower() for name in
+                         Request.required_headers + tuple(
+                             Request.header_allowlist))
+            names = set(name.encode() for name in parsed)
+            lengths = set(len(name) for name in names)
+            Request._allowed = (names, lengths, Request.header_allowlist,
+                                parsed, max(lengths))
+        return Request._allowed
 
 
 class Response(BaseResponse):
@@ -131,35 +400,114 @@ class Response(BaseResponse):
                    "N/A" for any other status codes.
     """
 
+    #: The size of the buffer the status line, the headers and small bodies
+    #: are assembled in, to send them to the client in a single write.
+    write_buffer_size = 512
+
+    _write_buffer = None
+    _write_buffer_busy = False
+    _heads = {}
+
     async def write(self, stream):
         self.complete()
 
+        # the shared buffer is used by one response at a time, responses
+        # written while it is busy get their own
+        shared = not Response._write_buffer_busy
+        if shared:
+            if Response._write_buffer is None:
+                Response._write_buffer = bytearray(self.write_buffer_size)
+            buffer = Response._write_buffer
+            Response._write_buffer_busy = True
+        else:
+            buffer = bytearray(self.write_buffer_size)
+
         try:
-            # status code
-            reason = self.reason if self.reason is not None else \
-                ('OK' if self.status_code == 200 else 'N/A')
-            await stream.awrite('HTTP/1.0 {status_code} {reason}\r\n'.format(
-                status_code=self.status_code, reason=reason).encode())
-
-            # headers
-            for header, value in self.headers.items():
-                values = value if isinstance(value, list) else [value]
-                for value in values:
-                    await stream.awrite('{header}: {value}\r\n'.format(
-                        header=header, value=value).encode())
-            await stream.awrite(b'\r\n')
-
-            # body
+            n = self._assemble(buffer)
+            if n < 0:  # pragma: no cover
+                # the headers don't fit in the buffer
+                await self._write_head(stream)
+                n = 0
+            mv = memoryview(buffer)
+
+            # body, the first chunk goes out with the headers if it fits
+            first = True
             async for body in self.body_iter():
                 if isinstance(body, str):  # pragma: no cover
                     body = body.encode()
+                if first:
+                    first = False
+                    if n + len(body) <= len(buffer):
+                        buffer[n:n + len(body)] = body
+                        n += len(body)
+                        body = None
+                    if n:
+                        await stream.awrite(mv[:n])
+                        n = 0
+                    if shared:
+                        # streamed bodies can take long to complete, the
+                        # buffer isn't needed once the headers are out
+                        Response._write_buffer_busy = shared = False
+                    if body is None:
+                        continue
                 await stream.awrite(body)
+            if n:
+                await stream.awrite(mv[:n])
         except OSError as exc:  # pragma: no cover
             if exc.errno in MUTED_SOCKET_ERRORS or \
                     exc.args[0] == 'Connection lost':
                 pass
             else:
                 raise
+        finally:
+            if shared:
+                Response._write_buffer_busy = False
+            if hasattr(self.body, 'aclose'):
+                # lets streamed bodies release their resources when the
+                # client goes away
+                await self.body.aclose()
+
+    def _assemble(self, buffer):
+        # the status line and content type are rendered once for each
+        # combination and cached
+        reason = self.reason if self.reason is not None else \
+            ('OK' if self.status_code == 200 else 'N/A')
+        content_type = self.headers.get('Content-Type')
+        key = (self.status_code, reason, content_type)
+        head = Response._heads.get(key)
+        if head is None:
+            if len(Response._heads) >= 16:
+                Response._heads.clear()
+            head = 'HTTP/1.0 {status_code} {reason}\r\n'.format(
+                status_code=self.status_code, reason=reason).encode()
+            if content_type is not None:
+                head += 'Content-Type: {content_type}\r\n'.format(
+                    content_type=content_type).encode()
+            Response._heads[key] = head
+
+        n = _put(buffer, 0, head)
+        for header, value in self.headers.items():
+            if value is content_type and header.lower() == 'content-type':
+                continue
+            values = value if isinstance(value, list) else [value]
+            for value in values:
+                n = _put(buffer, n, header.encode())
+                n = _put(buffer, n, b': ')
+                n = _put(buffer, n, str(value).encode())
+                n = _put(buffer, n, b'\r\n')
+        return _put(buffer, n, b'\r\n')
+
+    async def _write_head(self, stream):  # pragma: no cover
+        reason = self.reason if self.reason is not None else \
+            ('OK' if self.status_code == 200 else 'N/A')
+        await stream.awrite('HTTP/1.0 {status_code} {reason}\r\n'.format(
+            status_code=self.status_code, reason=reason).encode())
+        for header, value in self.headers.items():
+            values = value if isinstance(value, list) else [value]
+            for value in values:
+                await stream.awrite('{header}: {value}\r\n'.format(
+                    header=header, value=value).encode())
+        await stream.awrite(b'\r\n')
 
     def body_iter(self):
         if hasattr(self.body, '__anext__'):
@@ -184,11 +532,10 @@ class Response(BaseResponse):
                         self.i = 2  # response body is a file-like object
                     elif hasattr(response.body, '__next__'):
                         self.i = 1  # response body is a sync generator
-                        return next(response.body)
                     else:
                         self.i = -1  # response body is a plain string
                         return response.body
-                elif self.i == 1:
+                if self.i == 1:
                     try:
                         return next(response.body)
                     except StopIteration:
@@ -208,6 +555,93 @@ class Response(BaseResponse):
 
 
 class Microdot(BaseMicrodot):
+    #: Specify how many seconds a persistent connection is kept open while
+    #: waiting for the next request from the client.
+    #:
+    #: Example::
+    #:
+    #:    app.keep_alive_timeout = 2
+    keep_alive_timeout = 5
+
+    #: Specify how many seconds a new connection is kept open while waiting
+    #: for its first request, so idle connections don't hold a slot of
+    #: ``max_connections`` forever.
+    #:
+    #: Example::
+    #:
+    #:    app.request_timeout = 10
+    request_timeout = 5
+
+    #: Specify the maximum number of requests that are served over a single
+    #: connection before it is closed. Set to 1 to disable persistent
+    #: connections.
+    #:
+    #: Example::
+    #:
+    #:    app.keep_alive_max_requests = 10
+    keep_alive_max_requests = 100
+
+    #: Specify how many buffers are preallocated to read requests into, and
+    #: the size of each one. Requests read while all the buffers are in use
+    #: get a newly allocated buffer. Lines longer than a buffer, up to
+    #: ``Request.max_readline``, are read into a larger buffer allocated for
+    #: the request.
+    #:
+    #: Example::
+    #:
+    #:    app.buffer_count = 4
+    #:    app.buffer_size = 2048
+    buffer_count = 2
+    buffer_size = 1024
+    buffer_pool = None
+
+    #: Specify the maximum number of connections that are served at the same
+    #: time. Connections arriving past this limit are answered with a 503
+    #: status code without reading the request. The default of ``None``
+    #: accepts all connections.
+    #:
+    #: Example::
+    #:
+    #:    app.max_connections = 4
+    max_connections = None
+
+    #: Specify the maximum number of long-lived connections served at the
+    #: same time, these are responses with a streamed body and connections
+    #: upgraded to another protocol, such as WebSocket. They stop counting
+    #: towards ``max_connections`` once established, so they can't lock out
+    #: regular requests. Streams past this limit are answered with a 503
+    #: status code. The default of ``None`` accepts all streams.
+    #:
+    #: Example::
+    #:
+    #:    app.max_streams = 2
+    max_streams = None
+
+    #: Specify the minimum amount of free memory, in bytes, needed to accept
+    #: a connection. When less memory is free a garbage collection is
+    #: attempted, and if that doesn't free enough the connection is answered
+    #: with a 503 status code. Only available on platforms that implement
+    #: ``gc.mem_free()``. The default of ``None`` disables the check.
+    #:
+    #: Example::
+    #:
+    #:    app.min_free_memory = 8 * 1024
+    min_free_memory = None
+
+    #: The number of seconds clients are asked to wait in the ``Retry-After``
+    #: header of the 503 responses sent when a limit is exceeded.
+    retry_after = 1
+
+    def __init__(self):
+        super().__init__()
+        #: The number of connections currently being served.
+        self.connections = 0
+        #: The number of long-lived connections currently being served.
+        self.streams = 0
+        #: The number of connections rejected because of each limit.
+        self.shed = {'connections': 0, 'memory': 0, 'streams': 0}
+        self._unavailable = None
+
     async def start_server(self, host='0.0.0.0', port=5000, debug=False,
                            ssl=None):
         """Start the Microdot web server as a coroutine. This coroutine does
@@ -253,7 +687,9 @@ class Microdot(BaseMicrodot):
             if not hasattr(writer, 'awrite'):  # pragma: no cover
                 # CPython provides the awrite and aclose methods in 3.8+
                 async def awrite(self, data):
-                    self.write(data)
+                    # streamed bodies reuse their buffer for every chunk and
+                    # the transport may hold on to what it couldn't send
+                    self.write(bytes(data))
                     await self.drain()
 
                 async def aclose(self):
@@ -264,7 +700,14 @@ class Microdot(BaseMicrodot):
                 writer.awrite = MethodType(awrite, writer)
                 writer.aclose = MethodType(aclose, writer)
 
-            await self.handle_request(reader, writer)
+            if self._overloaded():
+                await self._reject(reader, writer)
+                return
+            self.connections += 1
+            try:
+                await self.handle_request(reader, writer)
+            finally:
+                self.connections -= 1
 
         if self.debug:  # pragma: no cover
             print('Starting async server on {host}:{port}...'.format(
@@ -323,27 +766,132 @@ class Microdot(BaseMicrodot):
         self.server.close()
 
     async def handle_request(self, reader, writer):
-        req = None
+        if self.buffer_pool is None:
+            self.buffer_pool = BufferPool(self.buffer_count, self.buffer_size)
+        reader = _BufferedReader(reader, self.buffer_pool)
+        served = 0
+        keep_alive = True
+        while keep_alive:
+            req = None
+            try:
+                create = Request.create(self, reader, writer,
+                                        writer.get_extra_info('peername'))
+                timeout = self.keep_alive_timeout if served \
+                    else self.request_timeout
+                req = await asyncio.wait_for(create, timeout)
+                if req is None:
+                    break  # the client closed the connection
+            except asyncio.TimeoutError:
+                break
+            except Exception as exc:  # pragma: no cover
+                print_exception(exc)
+            served += 1
+
+            try:
+                res = await self.dispatch_request(req)
+                if res == Response.already_handled:
+                    break
+                if req and hasattr(res.body, '__anext__') and \
+                        not self.start_stream(req):
+                    if hasattr(res.body, 'aclose'):
+                        await res.body.aclose()
+                    res = Response(status_code=503, headers={
+                        'Retry-After': str(self.retry_after)})
+                keep_alive = served < self.keep_alive_max_requests and \
+                    self._keep_alive(req, res)
+                res.headers['Connection'] = 'keep-alive' if keep_alive \
+                    else 'close'
+                await res.write(writer)
+            finally:
+                if req and req.long_lived:
+                    req.long_lived = False
+                    self.streams -= 1
+                    self.connections += 1
+            reader.release()
+            if self.debug and req:  # pragma: no cover
+                print('{method} {path} {status_code}'.format(
+                    method=req.method, path=req.path,
+                    status_code=res.status_code))
+        reader.release(force=True)
         try:
-            req = await Request.create(self, reader, writer,
-                                       writer.get_extra_info('peername'))
-        except Exception as exc:  # pragma: no cover
-            print_exception(exc)
-
-        res = await self.dispatch_request(req)
-        if res != Response.already_handled:  # pragma: no branch
-            await res.write(writer)
+            await writer.aclose()
+        except OSError as exc:  # pragma: no cover
+            if exc.errno in MUTED_SOCKET_ERRORS:
+                pass
+            else:
+                raise
+
+    def start_stream(self, req):
+        """Move the connection of a request from the count of connections to
+        the count of long-lived ones. It is called for responses with a
+        streamed body, and by handlers that take over the connection, such as
+        the WebSocket upgrade. Returns ``False`` if ``max_streams`` are
+        already being served.
+
+        :param req: The request whose connection becomes long-lived.
+        """
+        if req.long_lived:
+            return True
+        if self.max_streams is not None and \
+                self.streams >= self.max_streams:
+            self.shed['streams'] += 1
+            return False
+        req.long_lived = True
+        self.connections -= 1
+        self.streams += 1
+        return True
+
+    def _overloaded(self):
+        if self.max_connections is not None and \
+                self.connections >= self.max_connections:
+            self.shed['connections'] += 1
+            return True
+        if self.min_free_memory is not None and hasattr(gc, 'mem_free'):
+            if gc.mem_free() < self.min_free_memory:
+                gc.collect()
+                if gc.mem_free() < self.min_free_memory:
+                    self.shed['memory'] += 1
+                    return True
+        return False
+
+    async def _reject(self, reader, writer):
+        # the response is rendered once and the request is never parsed, so
+        # rejecting a connection allocates as little as possible
+        if self._unavailable is None:
+            self._unavailable = (
+                'HTTP/1.0 503 Service Unavailable\r\n'
+                'Retry-After: {retry_after}\r\n'
+                'Content-Length: 0\r\n'
+                'Connection: close\r\n\r\n').format(
+                    retry_after=self.retry_after).encode()
         try:
+            await writer.awrite(self._unavailable)
+            # closing with unread data resets the connection, which can
+            # destroy the response before the client sees it
+            try:
+                await asyncio.wait_for(reader.read(self.buffer_size), 0.1)
+            except asyncio.TimeoutError:
+                pass
             await writer.aclose()
         except OSError as exc:  # pragma: no cover
             if exc.errno in MUTED_SOCKET_ERRORS:
                 pass
             else:
                 raise
-        if self.debug and req:  # pragma: no cover
-            print('{method} {path} {status_code}'.format(
-                method=req.method, path=req.path,
-                status_code=res.status_code))
+
+    def _keep_alive(self, req, res):
+        if req is None or req.content_length > req.max_body_length:
+            # the request could not be parsed, or its body was not consumed
+            return False
+        connection = req.headers.get('Connection', '').lower()
+        if req.http_version == '1.0':
+            if 'keep-alive' not in connection:
+                return False
+        elif 'close' in connection:
+            return False
+        res.complete()
+        # a 304 response never has a body, so it doesn't need a length
+        return res.status_code == 304 or 'Content-Length' in res.headers
 
     async def dispatch_request(self, req):
         if req:
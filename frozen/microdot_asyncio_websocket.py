@@ -0,0 +1,221 @@
+"""
+microdot_asyncio_websocket
+--------------------------
+
+The ``microdot_asyncio_websocket`` module adds WebSocket support to
+applications based on ``microdot_asyncio``.
+"""
+try:
+    import ubinascii as binascii
+except ImportError:
+    import binascii
+
+try:
+    import uhashlib as hashlib
+except ImportError:
+    import hashlib
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from microdot import abort
+from microdot_asyncio import Response
+
+
+class WebSocketError(Exception):
+    """Exception raised when the client sends an invalid frame or closes the
+    connection."""
+    pass
+
+
+class WebSocket:
+    """A WebSocket connection.
+
+    Frames are received into and sent from buffers allocated once for each
+    connection, so exchanging small messages does not allocate memory. Sends
+    from concurrent tasks are serialized, so they can share the connection.
+
+    :param request: The request that was upgraded to a WebSocket connection.
+    """
+    GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    CONT = 0
+    TEXT = 1
+    BINARY = 2
+    CLOSE = 8
+    PING = 9
+    PONG = 10
+
+    #: The largest message that can be received, in bytes. Clients sending
+    #: larger messages are disconnected.
+    max_message_length = 256
+
+    #: The largest message that can be sent from the preallocated buffer,
+    #: larger messages are sent from a newly allocated one.
+    send_buffer_length = 128
+
+    def __init__(self, request):
+        self.request = request
+        self.closed = False
+        self._mask = bytearray(4)
+        self._payload = bytearray(self.max_message_length)
+        self._payload_mv = memoryview(self._payload)
+        self._frame = bytearray(self.send_buffer_length + 4)
+        self._send_lock = asyncio.Lock()
+
+    async def handshake(self):
+        key = self.request.headers.get('Sec-WebSocket-Key', '')
+        accept = binascii.b2a_base64(
+            hashlib.sha1(key.encode() + self.GUID).digest())[:-1]
+        await self.request.sock[1].awrite(
+            b'HTTP/1.1 101 Switching Protocols\r\n'
+            b'Upgrade: websocket\r\n'
+            b'Connection: Upgrade\r\n'
+            b'Sec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+    async def receive(self):
+        """Receive a message from the client.
+
+        This method is a coroutine. Text messages are returned as strings,
+        binary messages as a ``memoryview`` of the receive buffer that is only
+        valid until the next call.
+        """
+        while True:
+            opcode, payload = await self._read_frame()
+            if opcode == self.TEXT:
+                return str(payload, 'utf-8')
+            elif opcode == self.BINARY:
+                return payload
+            elif opcode == self.PING:
+                await self.send(payload, self.PONG)
+            elif opcode == self.CLOSE:
+                await self.close()
+                raise WebSocketError('Websocket connection closed')
+
+    async def send(self, data, opcode=None):
+        """Send a message to the client.
+
+        :param data: The message, as a string or a bytes-like object.
+        :param opcode: The frame opcode. The default is to send strings as
+                       text messages and anything else as binary messages.
+        """
+        if opcode is None:
+            opcode = self.TEXT if isinstance(data, str) else self.BINARY
+        if isinstance(data, str):
+            data = data.encode()
+        length = len(data)
+        # a stream can only be drained by one task at a time, and the frame
+        # buffer is shared until the write completes
+        async with self._send_lock:
+            if length > self.send_buffer_length:
+                frame = bytearray(length + 10)
+            else:
+                frame = self._frame
+            frame[0] = 0x80 | opcode
+            if length < 126:
+                frame[1] = length
+                n = 2
+            elif length < 65536:
+                frame[1] = 126
+                frame[2] = length >> 8
+                frame[3] = length & 0xff
+                n = 4
+            else:
+                frame[1] = 127
+                for i in range(8):
+                    frame[9 - i] = (length >> (8 * i)) & 0xff
+                n = 10
+            frame[n:n + length] = data
+            await self.request.sock[1].awrite(
+                memoryview(frame)[:n + length])
+
+    async def close(self):
+        if not self.closed:
+            self.closed = True
+            try:
+                await self.send(b'', self.CLOSE)
+            except OSError:  # pragma: no cover
+                pass
+
+    async def _read_frame(self):
+        reader = self.request.sock[0]
+        header = await reader.readexactly(2)
+        opcode = header[0] & 0x0f
+        has_mask = header[1] & 0x80
+        length = header[1] & 0x7f
+        if length == 126:
+            ext = await reader.readexactly(2)
+            length = ext[0] << 8 | ext[1]
+        elif length == 127:
+            raise WebSocketError('Message too long')
+        if length > self.max_message_length:
+            raise WebSocketError('Message too long')
+        if has_mask:
+            self._mask[:] = await reader.readexactly(4)
+        payload = self._payload
+        payload[:length] = await reader.readexactly(length)
+        if has_mask:
+            mask = self._mask
+            for i in range(length):
+                payload[i] ^= mask[i & 3]
+        return opcode, self._payload_mv[:length]
+
+
+async def websocket_upgrade(request):
+    """Upgrade a request handler to a websocket connection.
+
+    This function can be called directly inside a route function to process a
+    WebSocket upgrade handshake, for example after the user's credentials are
+    verified. The connection stops counting towards the application's
+    ``max_connections``, and the request is aborted with a 503 status code
+    if ``max_streams`` are already being served. The function returns the
+    websocket object::
+
+        @app.route('/echo')
+        async def echo(request):
+            if not authenticate_user(request):
+                abort(401)
+            ws = await websocket_upgrade(request)
+            while True:
+                message = await ws.receive()
+                await ws.send(message)
+    """
+    if not request.app.start_stream(request):
+        abort(503)
+    ws = WebSocket(request)
+    await ws.handshake()
+
+    @request.after_request
+    async def after_request(request, response):
+        return Response.already_handled
+
+    return ws
+
+
+def with_websocket(f):
+    """Decorator to make a route a WebSocket endpoint.
+
+    This decorator is used to define a route that accepts websocket
+    connections. The route then can receive and send messages using
+    the ``receive()`` and ``send()`` methods of the websocket object,
+    and the connection is closed when the route function returns.
+
+    Example::
+
+        @app.route('/echo')
+        @with_websocket
+        async def echo(request, ws):
+            while True:
+                message = await ws.receive()
+                await ws.send(message)
+    """
+    async def wrapper(request, *args, **kwargs):
+        ws = await websocket_upgrade(request)
+        try:
+            await f(request, ws, *args, **kwargs)
+            await ws.close()
+        except (OSError, EOFError, WebSocketError):
+            pass
+        return ''
+    return wrapper
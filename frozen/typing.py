@@ -5,6 +5,7 @@ class Callable: pass
 class Dict: pass
 class Generator: pass
 class Iterable: pass
+class Iterator: pass
 class List: pass
 class NoReturn: pass
 class Optional: pass
@@ -1,7 +1,12 @@
-from typing import Any, Dict
+from array import array
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from exceptions import PinNotFound
-from gpio import pin
+import events
+import jobs
+import sampler
+from exceptions import GroupNotFound, JobNotFound, NotMeasured, PinNotFound, SchemaError
+from gpio import group, pin
+from waveform import Waveform
 
 
 async def gpio_state(pin_id_or_alias:str) -> Dict[str, Any]:
@@ -11,11 +16,42 @@ async def gpio_state(pin_id_or_alias:str) -> Dict[str, Any]:
     return gpio_pin.state()
 
 
-async def gpio_modulate(pin_id_or_alias:str, *actions:str, times:int) -> None:
+async def gpio_state_json(pin_id_or_alias:str) -> Tuple[str, bytes]:
     if not (gpio_pin := pin(pin_id_or_alias)):
         raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
 
-    await gpio_pin.modulate(*actions, times=times)
+    return gpio_pin.state_json()
+
+
+async def gpio_measurement(pin_id_or_alias:str) -> Dict[str, Any]:
+    if not (gpio_pin := pin(pin_id_or_alias)):
+        raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+    if not (measurement := gpio_pin.measurement()):
+        raise NotMeasured(f"Pin {gpio_pin.id} has no measure mode configured")
+
+    return measurement
+
+
+async def gpio_modulate(pin_id_or_alias:str, code:array, times:int, policy:str="replace") -> jobs.Job:
+    if not (gpio_pin := pin(pin_id_or_alias)):
+        raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+    return jobs.submit(gpio_pin, gpio_pin.modulate(code, times=times), policy)
+
+
+async def gpio_waveform(pin_id_or_alias:str, wave:Waveform, times:int) -> None:
+    if not (gpio_pin := pin(pin_id_or_alias)):
+        raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+    gpio_pin.waveform(wave, times=times)
+
+
+async def gpio_subscribe(pin_id_or_alias:str, factory:Callable=events.Subscriber) -> events.Subscriber:
+    if not (gpio_pin := pin(pin_id_or_alias)):
+        raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+    return events.subscribe(gpio_pin, factory)
 
 
 async def gpio_on(pin_id_or_alias:str) -> None:
@@ -30,3 +66,105 @@ async def gpio_off(pin_id_or_alias:str) -> None:
         raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
 
     gpio_pin.off()
+
+
+async def group_state(group_name:str) -> Dict[str, Any]:
+    if not (pin_group := group(group_name)):
+        raise GroupNotFound(f"Group not found: {group_name}")
+
+    return pin_group.state()
+
+
+async def group_on(group_name:str) -> None:
+    if not (pin_group := group(group_name)):
+        raise GroupNotFound(f"Group not found: {group_name}")
+
+    pin_group.on()
+
+
+async def group_off(group_name:str) -> None:
+    if not (pin_group := group(group_name)):
+        raise GroupNotFound(f"Group not found: {group_name}")
+
+    pin_group.off()
+
+
+async def group_apply(group_name:str, *values:Any) -> None:
+    if not (pin_group := group(group_name)):
+        raise GroupNotFound(f"Group not found: {group_name}")
+
+    if len(values) != len(pin_group.pins):
+        raise SchemaError(f"Expected {len(pin_group.pins)} values for group {group_name}")
+
+    pin_group.apply(*values)
+
+
+async def job_list() -> List[Dict[str, Any]]:
+    return [job.state() for job in list(jobs.finished.values()) + list(jobs.registry.values())]
+
+
+async def job_cancel(job_id:int) -> None:
+    if not jobs.cancel(job_id):
+        raise JobNotFound(f"Job not found: {job_id}")
+
+
+async def sampler_start(pin_ids_or_aliases:List[str], rate_hz:int, size:int) -> Dict[str, Any]:
+    gpio_pins = []
+    for pin_id_or_alias in pin_ids_or_aliases:
+        if not (gpio_pin := pin(pin_id_or_alias)):
+            raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+        gpio_pins.append(gpio_pin)
+
+    sampler.start(gpio_pins, rate_hz, size)
+    return sampler.state()
+
+
+async def sampler_stop() -> None:
+    sampler.stop()
+
+
+async def sampler_state() -> Dict[str, Any]:
+    return sampler.state()
+
+
+async def sampler_data(since:Optional[int], encoding:str) -> Tuple[int, int, Iterator[bytes]]:
+    first, count = sampler.window(since)
+    return first, count, sampler.read(first, count, encoding)
+
+
+async def gpio_batch(*commands:Tuple[str, str, array, int, str], wait:bool=False) -> List[Dict[str, Any]]:
+    gpio_pins = []
+    for pin_id_or_alias, *_ in commands:
+        if not (gpio_pin := pin(pin_id_or_alias)):
+            raise PinNotFound(f"Pin not found: {pin_id_or_alias}")
+
+        gpio_pins.append(gpio_pin)
+
+    results = []
+    submitted = []
+    for gpio_pin, (pin_id_or_alias, cmd, code, times, policy) in zip(gpio_pins, commands):
+        result = {"pin": pin_id_or_alias, "cmd": cmd, "status": "done"}
+        try:
+            if cmd == "on":
+                gpio_pin.on()
+
+            elif cmd == "off":
+                gpio_pin.off()
+
+            elif cmd == "modulate":
+                job = jobs.submit(gpio_pin, gpio_pin.modulate(code, times=times), policy)
+                result.update(status=job.status, job=job.id)
+                submitted.append((result, job))
+
+        except Exception as ex:
+            result.update(status="error", error=str(ex))
+
+        results.append(result)
+
+    if wait:
+        for result, job in submitted:
+            result["timing"] = await job.wait()
+            result["status"] = job.status
+
+    return results
@@ -0,0 +1,126 @@
+from typing import Dict, Optional
+
+import uasyncio
+
+from actions import gpio_modulate, gpio_subscribe
+from events import Hub, Subscriber
+from exceptions import Conflict, NotFound, PinNotFound, SchemaError, Unavailable
+from gpio import pin
+from jobs import Job, policies
+from microdot_asyncio_websocket import WebSocket
+from script import compile_script
+
+# Commands are text frames of space separated words, each one gets a single reply frame:
+#   on PIN / off PIN / state PIN   ->  = PIN 0|1
+#   modulate PIN TIMES [POLICY] ACTION,ACTION,...   ->  + PIN JOB_ID
+#   watch PIN   ->  ~ PIN 0|1 EDGES, then again every time the pin changes
+#   unwatch PIN   ->  - PIN
+#   errors   ->  ! MESSAGE
+# PIN is echoed back as sent by the client
+
+
+class Watcher(Subscriber):
+    ping = None
+
+    def __init__(self, hub:Hub, name:str):
+        self.name = name
+        super().__init__(hub)
+
+    def render(self, _seq:int, value:int, edges:int) -> bytes:
+        return f"~ {self.name} {1 if value else 0} {edges}".encode()
+
+
+class Session:
+    def __init__(self, ws:WebSocket):
+        self.ws = ws
+        self.watchers:Dict[str, Watcher] = {}
+        self.tasks:Dict[str, uasyncio.Task] = {}
+
+    async def run(self) -> None:
+        try:
+            while True:
+                message = await self.ws.receive()
+                if not isinstance(message, str):
+                    message = str(message, "utf-8")
+                try:
+                    reply = await self.execute(message)
+                except (NotFound, SchemaError, Conflict, Unavailable) as ex:
+                    reply = f"! {ex}"
+                if reply:
+                    await self.ws.send(reply)
+        finally:
+            for name in list(self.watchers):
+                self.unwatch(name)
+
+    async def execute(self, message:str) -> Optional[str]:
+        words = message.split(" ", 2)
+        if len(words) < 2:
+            raise SchemaError(f"Malformed command '{message}'")
+
+        cmd, name = words[0], words[1]
+        if not (gpio_pin := pin(name)):
+            raise PinNotFound(f"Pin not found: {name}")
+
+        # on, off and state skip the actions, a command is a frame parse and a pin write
+        if cmd == "on":
+            gpio_pin.on()
+            return f"= {name} {gpio_pin.value()}"
+
+        elif cmd == "off":
+            gpio_pin.off()
+            return f"= {name} {gpio_pin.value()}"
+
+        elif cmd == "state":
+            return f"= {name} {gpio_pin.value()}"
+
+        elif cmd == "modulate":
+            job = await self.modulate(name, words[2] if len(words) > 2 else "")
+            return f"+ {name} {job.id}"
+
+        elif cmd == "watch":
+            if not (watcher := self.watchers.get(name)) or watcher.dropped:
+                await self.watch(name)
+            return None
+
+        elif cmd == "unwatch":
+            self.unwatch(name)
+            return f"- {name}"
+
+        raise SchemaError(f"Unknown command '{cmd}'")
+
+    async def modulate(self, name:str, args:str) -> Job:
+        words = args.split(" ", 1)
+        if len(words) < 2:
+            raise SchemaError("Expected the number of times and a script")
+
+        try:
+            times = int(words[0])
+        except ValueError:
+            raise SchemaError("Times must be an integer")
+
+        policy = "replace"
+        script = words[1]
+        words = script.split(" ", 1)
+        if len(words) == 2 and words[0] in policies:
+            policy, script = words
+
+        return await gpio_modulate(name, compile_script(*script.split(",")), times=times, policy=policy)
+
+    async def watch(self, name:str) -> None:
+        self.unwatch(name)
+        watcher = await gpio_subscribe(name, lambda hub: Watcher(hub, name))
+        self.watchers[name] = watcher
+        self.tasks[name] = uasyncio.create_task(self.forward(watcher))
+
+    def unwatch(self, name:str) -> None:
+        if watcher := self.watchers.pop(name, None):
+            watcher.hub.unsubscribe(watcher)
+            self.tasks.pop(name).cancel()
+
+    async def forward(self, watcher:Watcher) -> None:
+        async for event in watcher:
+            await self.ws.send(event, WebSocket.TEXT)
+
+
+async def serve(ws:WebSocket) -> None:
+    await Session(ws).run()
@@ -0,0 +1,141 @@
+from array import array
+from typing import Callable, Dict, List
+
+import uasyncio
+
+from exceptions import TooManySubscribers
+from pinplus import EdgeReader, PinPlus
+
+max_subscribers = 2
+queue_size = 8
+# Edges closer together than this are merged into a single event, which also filters out switch bounce
+merge_ms = 20
+# Edges closer than this to the previous one are contact bounce and aren't counted
+debounce_us = 1000
+ping_ms = 15000
+
+hubs:Dict[int, "Hub"] = {}
+
+
+class Subscriber:
+    # Written when no event was pushed for ping_ms, None to not write anything
+    ping = b": ping\n\n"
+
+    def __init__(self, hub:"Hub"):
+        self.hub = hub
+        self.queue:List[bytes] = []
+        self.ready = uasyncio.Event()
+        self.dropped = False
+
+    def render(self, seq:int, value:int, edges:int) -> bytes:
+        value = "true" if value else "false"
+        return f'id: {seq}\nevent: change\ndata: {{"value": {value}, "edges": {edges}}}\n\n'.encode()
+
+    def push(self, event:bytes) -> None:
+        # A subscriber that can't keep up is dropped instead of letting its queue grow
+        if len(self.queue) >= queue_size:
+            self.dropped = True
+            self.hub.unsubscribe(self)
+        else:
+            self.queue.append(event)
+
+        self.ready.set()
+
+    def __aiter__(self) -> "Subscriber":
+        return self
+
+    async def __anext__(self) -> bytes:
+        while not self.queue:
+            if self.dropped:
+                raise StopAsyncIteration
+
+            self.ready.clear()
+            try:
+                await uasyncio.wait_for_ms(self.ready.wait(), ping_ms)
+            except uasyncio.TimeoutError:
+                # Comments are ignored by clients, writing one finds out whether the connection is still alive
+                if self.ping:
+                    return self.ping
+
+        if self.dropped:
+            raise StopAsyncIteration
+
+        return self.queue.pop(0)
+
+    async def aclose(self) -> None:
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    def __init__(self, gpio_pin:PinPlus):
+        self.pin = gpio_pin
+        self.subscribers:List[Subscriber] = []
+        self.flag = uasyncio.ThreadSafeFlag()
+        self.edges = array("i", [0] * 16)
+        self.reader = None
+        self.seq = 0
+        self._task = None
+
+    def subscribe(self, factory:Callable[["Hub"], Subscriber]=Subscriber) -> Subscriber:
+        if len(self.subscribers) >= max_subscribers:
+            raise TooManySubscribers(f"Too many subscribers to pin {self.pin.id}, the limit is {max_subscribers}")
+
+        # Capturing fails on pins counting edges for a measure, before anything is allocated for the subscriber
+        if not self._task:
+            self.pin.capture(self._on_capture, size=16, debounce_us=debounce_us)
+            self.reader = EdgeReader(self.pin)
+            self._task = uasyncio.create_task(self._run())
+
+        subscriber = factory(self)
+        self.seq += 1
+        subscriber.push(subscriber.render(self.seq, self.pin.value(), 0))
+        self.subscribers.append(subscriber)
+
+        return subscriber
+
+    def unsubscribe(self, subscriber:Subscriber) -> None:
+        if subscriber not in self.subscribers:
+            return
+
+        self.subscribers.remove(subscriber)
+        if not self.subscribers:
+            self.pin.stop_capture()
+            # Subscribers dropped for falling behind are unsubscribed from the hub's own task, which can't cancel
+            # itself, it returns once it's done pushing the event instead
+            if self._task is not uasyncio.current_task():
+                self._task.cancel()
+            self._task = None
+
+    def _on_capture(self, _gpio_pin:PinPlus) -> None:
+        self.flag.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self.flag.wait()
+            await uasyncio.sleep_ms(merge_ms)
+            edges = self.reader.lost
+            value = None
+            while count := self.reader.read(self.edges):
+                edges += count
+                value = self.edges[2 * count - 1]
+
+            self.reader.lost = 0
+            if not edges:
+                continue
+
+            if value is None:
+                value = self.pin.value()
+            self.seq += 1
+            # Subscribers render the event in the format of their connection
+            for subscriber in self.subscribers[:]:
+                subscriber.push(subscriber.render(self.seq, value, edges))
+
+            if not self.subscribers:
+                return
+
+
+def subscribe(gpio_pin:PinPlus, factory:Callable[["Hub"], Subscriber]=Subscriber) -> Subscriber:
+    if not (hub := hubs.get(gpio_pin.id)):
+        hub = hubs[gpio_pin.id] = Hub(gpio_pin)
+
+    return hub.subscribe(factory)
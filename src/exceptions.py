@@ -1,5 +1,18 @@
 class NotFound(Exception): pass
 class PinNotFound(NotFound): pass
+class GroupNotFound(NotFound): pass
+class JobNotFound(NotFound): pass
+class NotMeasured(NotFound): pass
 
 class SchemaError(Exception): pass
 class MissingField(SchemaError): pass
+class ScriptError(SchemaError): pass
+class UnsupportedPin(SchemaError): pass
+
+class Conflict(Exception): pass
+class PinBusy(Conflict): pass
+class IrqBusy(Conflict): pass
+
+class Unavailable(Exception): pass
+class TooManyJobs(Unavailable): pass
+class TooManySubscribers(Unavailable): pass
@@ -1,33 +1,68 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from pinplus import PinPlus
+from pinplus import PinGroup, PinPlus
 
 pin_names:Dict[str, int] = {}
 pin_config:Dict[int, PinPlus] = {}
+pin_table:Dict[Any, PinPlus] = {}
+pin_groups:Dict[str, PinGroup] = {}
+multicast_groups:Dict[str, PinGroup] = {}
 
 
 def setup(names:Dict[str, int], config:Dict[str, Any]) -> None:
     pin_names.update(names)
     _initialize_pins()
     _configure_pins(config)
+    _configure_groups(config)
+    _configure_multicast(config)
 
 
 def _initialize_pins() -> None:
     for pin_id in set(pin_names.values()):
         pin_config[pin_id] = PinPlus(pin_id)
 
+    # Every way of referring to a pin resolves with one lookup, aliases go last so they win over pin numbers
+    for pin_id, gpio_pin in pin_config.items():
+        pin_table[pin_id] = gpio_pin
+        pin_table[str(pin_id)] = gpio_pin
+
+    for pin_name, pin_id in pin_names.items():
+        pin_table[pin_name] = pin_config[pin_id]
+
 
 def _configure_pins(config:Dict[str, Any]) -> None:
     for pin_name, pin_config in config.items():
-        pin(pin_name).easy_config(**pin_config)
+        if "pins" not in pin_config:
+            pin(pin_name).easy_config(**{key: value for key, value in pin_config.items() if key != "multicast"})
+
+
+def _configure_groups(config:Dict[str, Any]) -> None:
+    # Groups are built after the pins are configured, their masks depend on the pins being inverted or not
+    for group_name, group_config in config.items():
+        if "pins" in group_config:
+            pin_groups[group_name] = PinGroup(*(pin(pin_name) for pin_name in group_config["pins"]))
+
+
+def _configure_multicast(config:Dict[str, Any]) -> None:
+    # All the pins of a multicast group are merged into a single PinGroup, a command switches them at the same time
+    members:Dict[str, List[PinPlus]] = {}
+    for name, entry in config.items():
+        targets = [pin(pin_name) for pin_name in entry["pins"]] if "pins" in entry else [pin(name)]
+        for multicast_name in entry.get("multicast", ()):
+            group_pins = members.setdefault(multicast_name, [])
+            group_pins.extend(gpio_pin for gpio_pin in targets if gpio_pin not in group_pins)
+
+    for multicast_name, group_pins in members.items():
+        multicast_groups[multicast_name] = PinGroup(*group_pins)
 
 
 def pin(pin_id_or_alias:str) -> Optional[PinPlus]:
-    pin_id = pin_names.get(pin_id_or_alias)
-    if not pin_id:
-        try:
-            pin_id = int(pin_id_or_alias)
-        except ValueError:
-            pass
-
-    return pin_config.get(pin_id)
+    return pin_table.get(pin_id_or_alias)
+
+
+def group(group_name:str) -> Optional[PinGroup]:
+    return pin_groups.get(group_name)
+
+
+def multicast_group(multicast_name:str) -> Optional[PinGroup]:
+    return multicast_groups.get(multicast_name)
@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Optional
+
+import uasyncio
+
+from exceptions import PinBusy, TooManyJobs
+from pinplus import PinPlus
+
+policies = ("replace", "queue", "reject")
+max_jobs = 4
+
+registry:Dict[int, "Job"] = {}
+pin_queues:Dict[int, List["Job"]] = {}
+# The last job that finished on each pin, so the timing of a script that wasn't waited for can still be read
+finished:Dict[int, "Job"] = {}
+_last_id = 0
+
+
+class Job:
+    def __init__(self, job_id:int, gpio_pin:PinPlus, coro:Any):
+        self.id = job_id
+        self.pin = gpio_pin
+        self.status = "queued"
+        self.result = None
+        self.done = uasyncio.Event()
+        self._coro = coro
+        self._task = None
+        self._started = False
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "pin": self.pin.id,
+            "status": self.status,
+            "result": self.result,
+        }
+
+    async def wait(self) -> Any:
+        await self.done.wait()
+        return self.result
+
+
+def submit(gpio_pin:PinPlus, coro:Any, policy:str="replace") -> Job:
+    global _last_id
+
+    queue = pin_queues.get(gpio_pin.id)
+    if queue and policy == "reject":
+        coro.close()
+        raise PinBusy(f"Pin {gpio_pin.id} is busy with job {queue[0].id}")
+
+    if queue and policy == "replace":
+        for job in queue[:]:
+            cancel(job.id)
+
+    if len(registry) >= max_jobs:
+        coro.close()
+        raise TooManyJobs(f"Too many jobs, the limit is {max_jobs}")
+
+    _last_id += 1
+    job = Job(_last_id, gpio_pin, coro)
+    registry[job.id] = job
+    pin_queues.setdefault(gpio_pin.id, []).append(job)
+    if len(pin_queues[gpio_pin.id]) == 1:
+        _start(job)
+
+    return job
+
+
+def cancel(job_id:int) -> Optional[Job]:
+    if not (job := registry.pop(job_id, None)):
+        return None
+
+    job.status = "cancelled"
+    if job._started:
+        # The job stays at the head of its pin's queue until the task has actually stopped, the next one is
+        # started from there
+        job._task.cancel()
+        return job
+
+    # A task cancelled before its first step never runs _run at all
+    if job._task:
+        job._task.cancel()
+    job._coro.close()
+    _finish(job)
+    return job
+
+
+def _start(job:Job) -> None:
+    job.status = "running"
+    job._task = uasyncio.create_task(_run(job))
+
+
+async def _run(job:Job) -> None:
+    job._started = True
+    try:
+        job.result = await job._coro
+        job.status = "done"
+    except uasyncio.CancelledError:
+        pass
+    except Exception as ex:
+        job.status = "failed"
+        job.result = {"error": str(ex)}
+    finally:
+        _finish(job)
+
+
+def _finish(job:Job) -> None:
+    # Runs once per job, when its coroutine has stopped or when it's cancelled before it started, dropping every
+    # reference to the coroutine so its memory can be reclaimed right away
+    registry.pop(job.id, None)
+    if not (queue := pin_queues.get(job.pin.id)) or job not in queue:
+        return
+
+    # Only the head of the queue is running, cancelling a job behind it must not start another one
+    head = queue[0] is job
+    queue.remove(job)
+    finished[job.pin.id] = job
+    if not queue:
+        del pin_queues[job.pin.id]
+    elif head:
+        _start(queue[0])
+
+    job._coro = None
+    job._task = None
+    job.done.set()
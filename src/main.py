@@ -1,6 +1,11 @@
+from typing import Any, Dict
+
+import uasyncio
+
 import config
 import gpio
 import routes
+import udp
 import wifi
 
 
@@ -12,6 +17,13 @@ def main() -> None:
     gpio_config = config.read_config("/etc/gpio_config.json")
     gpio.setup(pin_names["gpio"], gpio_config)
 
-    routes.start()
+    udp_config = config.read_config("/etc/udp_config.json")
+    uasyncio.run(serve(udp_config))
+
+
+async def serve(udp_config:Dict[str, Any]) -> None:
+    # The UDP listener shares the event loop with the HTTP server
+    udp.start(udp_config)
+    await routes.start()
 
 
@@ -1,9 +1,20 @@
-from itertools import count
+from array import array
 from typing import Any, Callable, Dict, Optional, Tuple
 
+import json
 import machine
+import micropython
+import os
+import time
 import uasyncio
 
+from exceptions import IrqBusy, SchemaError, UnsupportedPin
+from script import OP_DELAY, OP_DELAY_US, OP_OFF, OP_ON
+
+
+# Capture counters wrap like the ticks functions, so they stay small integers and never allocate
+CAPTURE_MASK = 0x3fffffff
+
 
 class PinPlus:
     # machine.Pin is wrapped because inheriting from it causes super() to misbehave ¯\_(ツ)_/¯
@@ -16,17 +27,43 @@ class PinPlus:
         "alt": None,
     }
 
+    # delay_us waits longer than this sleep until they are this close to the deadline and busy-wait the rest
+    spin_us = 2000
+    # Deadlines half the ticks_us period ahead or more wrap around, longer delays are waited in steps of this size
+    max_step_us = 1 << 28
+
+    measure_modes = ("counter", "frequency", "pulse_width")
+    irq_edges = {
+        "rising": machine.Pin.IRQ_RISING,
+        "falling": machine.Pin.IRQ_FALLING,
+        "both": machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING,
+    }
+
+    # Versions restart from zero on every boot, the epoch keeps ETags handed out before a reboot from matching
+    epoch = "{:08x}".format(int.from_bytes(os.urandom(4), "big"))
+
     def __init__(self, pin_id:int, mode:int=..., pull:int=..., *, value:Any=..., drive:int=..., alt:int=...,
                  invert:bool=False):
         self._pin_id = pin_id
         self._pin_state = self.defaults.copy()
+        self._state_cache:Optional[Tuple[int, int, str, bytes]] = None
+        self.version = 0
         self.invert = invert
+        self._measure_mode = None
+        self._measure_task = None
+        self._measurement = None
+        self._count = 0
+        self._capturing = False
         if self.invert and value is not ...:
             value = not bool(value)
 
         args, kwargs = self._filter_ellipsis(pin_id, mode, pull, value=value, drive=drive, alt=alt)
         self._pin = self.Pin(*args, **kwargs)
 
+    @property
+    def id(self) -> int:
+        return self._pin_id
+
     @classmethod
     def _pinattr(cls, attr_name:str) -> Any:
         if attr_name is ...:
@@ -34,7 +71,7 @@ class PinPlus:
         return getattr(cls.Pin, attr_name)
 
     @staticmethod
-    def _filter_ellipsis(*args:Any, **kwargs:Any) -> Tuple(Tuple(Any), Dict[str, Any]):
+    def _filter_ellipsis(*args:Any, **kwargs:Any) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
         fargs = tuple(i for i in args if i is not ...)
         fkwargs = {k: v for k, v in kwargs.items() if v is not ...}
         return fargs, fkwargs
@@ -49,6 +86,7 @@ class PinPlus:
 
         args, kwargs = self._filter_ellipsis(mode, pull, value=value, drive=drive, alt=alt)
         self._pin.init(*args, **kwargs)
+        self.version += 1
 
     def value(self, x:Any=...) -> Optional[int]:
         if x is ...:
@@ -61,6 +99,7 @@ class PinPlus:
         if self.invert:
             x = not bool(x)
 
+        self.version += 1
         return self._pin.value(x)
 
     def __call__(self, x:Any=...) -> Optional[int]:
@@ -72,18 +111,70 @@ class PinPlus:
     def off(self) -> None:
         self.value(0)
 
-    def irq(self, handler:Callable[["PinPlus"], None], trigger:int, *,
+    def irq(self, handler:Optional[Callable[["PinPlus"], None]], trigger:int=..., *,
             priority:int=..., wake:int=..., hard:bool=...) -> Callable[["PinPlus"], None]:
+        # A None handler disables the interrupt
+        callback = None
+        if handler:
+            def callback(_pin:self.Pin) -> None:
+                handler(self)
+
+        args, kwargs = self._filter_ellipsis(trigger, priority=priority, wake=wake, hard=hard)
+        self._pin.irq(callback, *args, **kwargs)
 
-        def callback(_pin:self.Pin) -> None:
-            handler(self)
+    def capture(self, handler:Optional[Callable[["PinPlus"], None]]=None, *, size:int=32,
+                debounce_us:int=0) -> None:
+        # Edges are recorded as (ticks_us, level) pairs by a hard IRQ handler into a ring buffer allocated here, both
+        # callbacks are bound once so recording an edge allocates nothing. Edges closer than debounce_us to the
+        # previous one are ignored, the handler runs later in soft context, once for each batch of edges
+        if self._measure_mode in ("counter", "frequency"):
+            raise IrqBusy(f"Pin {self._pin_id} is counting edges for its {self._measure_mode} measure")
 
-        args, kwargs = self._filter_ellipsis(priority=priority, wake=wake, hard=hard)
-        self._pin.irq(callback, trigger, *args, **kwargs)
+        self._capturing = True
+        self._ring = array("i", [0] * (2 * size))
+        self._ring_size = size
+        self._ring_index = 0
+        self.captured = 0
+        self._debounce_us = debounce_us
+        self._last_edge_us = time.ticks_add(time.ticks_us(), -debounce_us)
+        self._capture_handler = handler
+        self._capture_scheduled = False
+        self._on_edge_cb = self._on_edge
+        self._after_edges_cb = self._after_edges
+        self._pin.irq(self._on_edge_cb, self.Pin.IRQ_RISING | self.Pin.IRQ_FALLING, hard=True)
+
+    def stop_capture(self) -> None:
+        self._capturing = False
+        self._pin.irq(None)
+
+    def _on_edge(self, _pin:machine.Pin) -> None:
+        now = time.ticks_us()
+        if time.ticks_diff(now, self._last_edge_us) < self._debounce_us:
+            return
+
+        self._last_edge_us = now
+        i = self._ring_index
+        self._ring[2 * i] = now
+        self._ring[2 * i + 1] = self._pin.value() ^ self.invert
+        self._ring_index = (i + 1) % self._ring_size
+        self.captured = (self.captured + 1) & CAPTURE_MASK
+
+        if self._capture_handler and not self._capture_scheduled:
+            self._capture_scheduled = True
+            try:
+                micropython.schedule(self._after_edges_cb, None)
+            except RuntimeError:
+                # The schedule queue is full, the next edge will try again
+                self._capture_scheduled = False
+
+    def _after_edges(self, _arg:Any) -> None:
+        self._capture_scheduled = False
+        self._capture_handler(self)
 
     def _save_pin_state(self, mode:str=..., pull:str=..., drive:str=..., alt:str=...) -> None:
         _, kwargs = self._filter_ellipsis(mode=mode, pull=pull, drive=drive, alt=alt)
         self._pin_state.update(kwargs)
+        self.version += 1
 
     def state(self) -> Dict[str, Any]:
         pin_state = {
@@ -97,38 +188,298 @@ class PinPlus:
         pin_state["config"].update(self._pin_state)
         return pin_state
 
+    def state_json(self) -> Tuple[str, bytes]:
+        # Input pins and group writes change the level without going through value(), so the level read from the
+        # pin is part of the cache key along with the version
+        pin_value = self.value()
+        cache = self._state_cache
+        if cache and cache[0] == self.version and cache[1] == pin_value:
+            return cache[2], cache[3]
+
+        etag = f'"{self.epoch}-{self._pin_id}-{self.version}-{pin_value}"'
+        body = json.dumps(self.state()).encode()
+        self._state_cache = self.version, pin_value, etag, body
+        return etag, body
 
     def easy_config(self, *, mode:str=..., pull:str=..., value:Any=..., drive:str=..., alt:str=...,
-                    invert:bool=...) -> None:
+                    invert:bool=..., measure:Dict[str, Any]=...) -> None:
         args, kwargs = self._filter_ellipsis(
             self._pinattr(mode), self._pinattr(pull),
             value=value, drive=self._pinattr(drive), alt=self._pinattr(alt), invert=invert
         )
         self.init(*args, **kwargs)
         self._save_pin_state(mode=mode, pull=pull, drive=drive, alt=alt)
+        if measure is not ...:
+            self.measure(**measure)
+
+    def measure(self, mode:Optional[str], *, edge:str="rising", gate_ms:int=1000, level:int=1, samples:int=4,
+                timeout_us:int=20000) -> None:
+        # counter and frequency count edges from a hard IRQ handler into a wrapping integer, frequency and
+        # pulse_width are computed by a task once every gate_ms. A None mode stops measuring
+        if mode is not None and mode not in self.measure_modes:
+            raise SchemaError(f"Unknown measure mode: {mode}")
+        if edge not in self.irq_edges:
+            raise SchemaError(f"Unknown edge: {edge}")
+        # The pin has a single IRQ handler, which captures its edges while it has subscribers
+        if mode in ("counter", "frequency") and self._capturing:
+            raise IrqBusy(f"Pin {self._pin_id} is capturing edges, it can't count them for a {mode} measure")
+
+        if self._measure_task:
+            self._measure_task.cancel()
+            self._measure_task = None
+        if self._measure_mode in ("counter", "frequency"):
+            self._pin.irq(None)
+
+        self._measure_mode = mode
+        self._measurement = {"mode": mode} if mode else None
+        if mode in ("counter", "frequency"):
+            self._count = 0
+            self._on_count_cb = self._on_count
+            self._pin.irq(self._on_count_cb, self.irq_edges[edge], hard=True)
+
+        if mode in ("frequency", "pulse_width"):
+            self._measure_task = uasyncio.create_task(self._gate(gate_ms, level, samples, timeout_us))
+
+    def measurement(self) -> Optional[Dict[str, Any]]:
+        if self._measure_mode == "counter":
+            return {"mode": "counter", "count": self._count}
+
+        return self._measurement
+
+    def _on_count(self, _pin:machine.Pin) -> None:
+        self._count = (self._count + 1) & CAPTURE_MASK
+
+    def _snapshot_count(self) -> Tuple[int, int]:
+        irq_state = machine.disable_irq()
+        count = self._count
+        now = time.ticks_us()
+        machine.enable_irq(irq_state)
+        return count, now
+
+    async def _gate(self, gate_ms:int, level:int, samples:int, timeout_us:int) -> None:
+        count, start = self._snapshot_count()
+        while True:
+            await uasyncio.sleep_ms(gate_ms)
+            if self._measure_mode == "frequency":
+                now_count, now = self._snapshot_count()
+                edges = (now_count - count) & CAPTURE_MASK
+                elapsed = time.ticks_diff(now, start)
+                self._measurement = {
+                    "mode": "frequency",
+                    "hz": edges * 1000000 / elapsed,
+                    "edges": edges,
+                    "gate_us": elapsed,
+                }
+                count, start = now_count, now
+                continue
+
+            # time_pulse_us blocks, a batch takes at most samples * timeout_us
+            total = 0
+            widths = 0
+            timeouts = 0
+            min_us = None
+            max_us = None
+            for _ in range(samples):
+                width = machine.time_pulse_us(self._pin, level ^ self.invert, timeout_us)
+                if width < 0:
+                    timeouts += 1
+                    continue
+
+                widths += 1
+                total += width
+                if min_us is None or width < min_us:
+                    min_us = width
+                if max_us is None or width > max_us:
+                    max_us = width
+
+            self._measurement = {
+                "mode": "pulse_width",
+                "level": level,
+                "samples": widths,
+                "timeouts": timeouts,
+                "min_us": min_us,
+                "max_us": max_us,
+                "avg_us": total // widths if widths else None,
+            }
+
+    async def modulate(self, code:array, times:int=1) -> Dict[str, int]:
+        # Delays are scheduled against absolute deadlines, so the time spent switching pins and the event loop
+        # latency are absorbed by the next delay instead of accumulating over the run
+        deadline = time.ticks_us()
+        max_error = 0
+        missed = 0
+        remaining = times if times > 0 else -1
+        while remaining:
+            slept = False
+            for pc in range(0, len(code), 2):
+                op = code[pc]
+                if op == OP_ON or op == OP_OFF:
+                    if op == OP_ON:
+                        self.on()
+                    else:
+                        self.off()
+
+                    error = abs(time.ticks_diff(time.ticks_us(), deadline))
+                    if error > max_error:
+                        max_error = error
+
+                elif op == OP_DELAY or op == OP_DELAY_US:
+                    delay = code[pc + 1] * 1000 if op == OP_DELAY else code[pc + 1]
+                    while delay > self.max_step_us:
+                        slept = True
+                        delay -= self.max_step_us
+                        deadline = time.ticks_add(deadline, self.max_step_us)
+                        await uasyncio.sleep_ms(max(0, time.ticks_diff(deadline, time.ticks_us())) // 1000)
+
+                    deadline = time.ticks_add(deadline, delay)
+                    late = time.ticks_diff(time.ticks_us(), deadline)
+                    if late > 0:
+                        # The whole delay was overrun, resynchronize instead of rushing through the next steps
+                        missed += 1
+                        deadline = time.ticks_add(deadline, late)
+                        continue
+
+                    slept = True
+                    if op == OP_DELAY:
+                        await uasyncio.sleep_ms((500 - late) // 1000)
+                    else:
+                        await self._wait_until(deadline)
+
+            if not slept:
+                await uasyncio.sleep_ms(0)
+
+            if remaining > 0:
+                remaining -= 1
 
-    async def modulate(self, *actions:str, times:int=1) -> Callable[[], None]:
-        iterator = range(times)
-        if times < 1:
-            iterator = count()
-
-        for _ in iterator:
-            for action in actions:
-                if action == "on":
-                    self.on()
-                    await uasyncio.sleep_ms(1)
-
-                elif action == "off":
-                    self.off()
-                    await uasyncio.sleep_ms(1)
-
-                elif action.startswith("delay "):
-                    _, ms_str = action.split(" ", 1)
-                    try:
-                        ms = int(ms_str)
-                        await uasyncio.sleep_ms(ms)
-                    except ValueError:
-                        pass  # TODO: think how to handle faulty delays
-
-                else:
-                    pass  # TODO: think how to handle faulty actions
+        return {
+            "max_error_us": max_error,
+            "drift_us": time.ticks_diff(time.ticks_us(), deadline),
+            "missed_deadlines": missed,
+        }
+
+    def waveform(self, wave:"Waveform", times:int=1) -> None:
+        # machine.bitstream drives the pin through the GPIO_OUT_W1TS/W1TC registers, which GPIO16 isn't part of
+        if self._pin_id > 15:
+            raise UnsupportedPin(f"Waveforms are not supported on GPIO{self._pin_id}")
+
+        timing = wave.inverted_timing if self.invert else wave.timing
+        data = wave.render()
+        for _ in range(times):
+            machine.bitstream(self._pin, 0, timing, data)
+
+        # Every bit ends with the pin low, leave it in the off state
+        self.off()
+
+    async def _wait_until(self, deadline:int) -> None:
+        remaining = time.ticks_diff(deadline, time.ticks_us())
+        if remaining > self.spin_us:
+            await uasyncio.sleep_ms((remaining - self.spin_us) // 1000)
+
+        while time.ticks_diff(deadline, time.ticks_us()) > 0:
+            pass
+
+
+class EdgeReader:
+    # Follows the capture ring buffer of a pin from its own position, several readers can follow the same pin
+    def __init__(self, gpio_pin:PinPlus):
+        self.pin = gpio_pin
+        self.position = gpio_pin.captured
+        self.lost = 0
+
+    def read(self, out:array) -> int:
+        # Copies the pending edges into out as (ticks_us, level) pairs and returns how many were copied. Edges that
+        # were overwritten before being read are added to lost
+        gpio_pin = self.pin
+        ring = gpio_pin._ring
+        size = gpio_pin._ring_size
+        irq_state = machine.disable_irq()
+        pending = (gpio_pin.captured - self.position) & CAPTURE_MASK
+        if pending > size:
+            self.lost += pending - size
+            pending = size
+
+        count = min(pending, len(out) // 2)
+        start = gpio_pin._ring_index - pending
+        for k in range(count):
+            i = 2 * ((start + k) % size)
+            out[2 * k] = ring[i]
+            out[2 * k + 1] = ring[i + 1]
+
+        self.position = (gpio_pin.captured - pending + count) & CAPTURE_MASK
+        machine.enable_irq(irq_state)
+        return count
+
+
+class PinGroup:
+    # ESP8266 output set/clear registers, writing a mask changes only the pins whose bits are set. They cover
+    # GPIO0-GPIO15, GPIO16 lives in the RTC block and has to be written through machine.Pin
+    GPIO_OUT_W1TS = 0x60000304
+    GPIO_OUT_W1TC = 0x60000308
+
+    def __init__(self, *pins:PinPlus):
+        self.pins = pins
+        self._on_set = 0
+        self._on_clear = 0
+        self._unmapped = tuple(gpio_pin for gpio_pin in pins if gpio_pin._pin_id > 15)
+
+        for gpio_pin in pins:
+            if gpio_pin._pin_id > 15:
+                continue
+
+            if gpio_pin.invert:
+                self._on_clear |= 1 << gpio_pin._pin_id
+            else:
+                self._on_set |= 1 << gpio_pin._pin_id
+
+    def _write(self, set_mask:int, clear_mask:int) -> None:
+        if set_mask:
+            machine.mem32[self.GPIO_OUT_W1TS] = set_mask
+        if clear_mask:
+            machine.mem32[self.GPIO_OUT_W1TC] = clear_mask
+
+    def value(self, x:Any=...) -> Optional[Tuple[int]]:
+        if x is ...:
+            return tuple(gpio_pin.value() for gpio_pin in self.pins)
+
+        if x:
+            self.on()
+        else:
+            self.off()
+
+    def __call__(self, x:Any=...) -> Optional[Tuple[int]]:
+        return self.value(x)
+
+    def on(self) -> None:
+        self._write(self._on_set, self._on_clear)
+        for gpio_pin in self._unmapped:
+            gpio_pin.on()
+
+    def off(self) -> None:
+        self._write(self._on_clear, self._on_set)
+        for gpio_pin in self._unmapped:
+            gpio_pin.off()
+
+    def apply(self, *values:Any) -> None:
+        set_mask = 0
+        clear_mask = 0
+        for gpio_pin, x in zip(self.pins, values):
+            if gpio_pin._pin_id > 15:
+                continue
+
+            if bool(x) != gpio_pin.invert:
+                set_mask |= 1 << gpio_pin._pin_id
+            else:
+                clear_mask |= 1 << gpio_pin._pin_id
+
+        self._write(set_mask, clear_mask)
+        for gpio_pin, x in zip(self.pins, values):
+            if gpio_pin._pin_id > 15:
+                gpio_pin.value(x)
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "value": [bool(gpio_pin.value()) for gpio_pin in self.pins],
+            "config": {
+                "pins": [gpio_pin._pin_id for gpio_pin in self.pins],
+            },
+        }
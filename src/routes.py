@@ -1,17 +1,35 @@
-from typing import Any, Dict, Optional
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
 
-import uasyncio
-
-from actions import gpio_modulate, gpio_on, gpio_off, gpio_state
-from exceptions import MissingField, NotFound, SchemaError
+import control
+from actions import (gpio_batch, gpio_measurement, gpio_modulate, gpio_on, gpio_off, gpio_state_json, gpio_subscribe,
+                     gpio_waveform, group_apply, group_off, group_on, group_state, job_cancel, job_list, sampler_data,
+                     sampler_start, sampler_state, sampler_stop)
+from exceptions import Conflict, MissingField, NotFound, SchemaError, Unavailable
+from gpio import pin
+from jobs import policies
 from microdot_asyncio import Microdot, Request, Response
+from microdot_asyncio_websocket import WebSocket, with_websocket
+from sampler import encodings, raw_length, width
+from script import compile_script
+from waveform import Waveform
 
 Response.default_content_type = "application/json"
+Request.header_allowlist = ()
 app = Microdot()
+app.max_connections = 4
+# Event streams and WebSockets are held open as long as their client stays, they are capped apart from the
+# connections so a few monitors can't lock out the rest of the API
+app.max_streams = 2
+app.min_free_memory = 6 * 1024
+
+# Returned without raising PinNotFound, misconfigured clients hitting unknown pins are common and exceptions are
+# expensive to allocate
+pin_not_found = b'{"error": "Pin not found"}', 404
 
 
-def start() -> None:
-    app.run(port=80, debug=True)
+async def start() -> None:
+    await app.start_server(port=80, debug=True)
 
 
 @app.get("/mem")
@@ -21,38 +39,188 @@ async def get_mem(_request:Request) -> None:
     micropython.qstr_info(True)
 
 
+@app.get("/stats")
+async def get_stats(_request:Request) -> None:
+    return {
+        "connections": app.connections,
+        "streams": app.streams,
+        "shed": app.shed,
+    }
+
+
 @app.get("/gpio/<pin_id_or_alias>")
-async def get_gpio(_request:Request, pin_id_or_alias:str) -> None:
-    state = await gpio_state(pin_id_or_alias)
-    return state
+async def get_gpio(request:Request, pin_id_or_alias:str) -> None:
+    if not pin(pin_id_or_alias):
+        return pin_not_found
+
+    etag, state = await gpio_state_json(pin_id_or_alias)
+    if request.headers.get("If-None-Match") == etag:
+        return None, 304, {"ETag": etag}
+
+    return state, 200, {"ETag": etag}
+
+
+@app.get("/gpio/<pin_id_or_alias>/events")
+async def get_gpio_events(_request:Request, pin_id_or_alias:str) -> None:
+    if not pin(pin_id_or_alias):
+        return pin_not_found
+
+    subscriber = await gpio_subscribe(pin_id_or_alias)
+    return subscriber, 200, {"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+
+
+@app.get("/gpio/<pin_id_or_alias>/measure")
+async def get_gpio_measure(_request:Request, pin_id_or_alias:str) -> None:
+    if not pin(pin_id_or_alias):
+        return pin_not_found
+
+    measurement = await gpio_measurement(pin_id_or_alias)
+    return measurement
 
 
 @app.post("/gpio/<pin_id_or_alias>")
 async def post_gpio(request:Request, pin_id_or_alias:str) -> None:
+    if not pin(pin_id_or_alias):
+        return pin_not_found
+
     body:Optional[Dict[str, Any]]
     if not (body := request.json):
         return None, 400
 
-    dispatcher = None
     cmd = get_field(body, "cmd")
     if cmd == "on":
-        dispatcher = gpio_on(pin_id_or_alias)
+        await gpio_on(pin_id_or_alias)
 
     elif cmd == "off":
-        dispatcher = gpio_off(pin_id_or_alias)
+        await gpio_off(pin_id_or_alias)
 
     elif cmd == "modulate":
-        script = get_field(body, "script")
-        times = body.pop("times", 1)
-        dispatcher = gpio_modulate(pin_id_or_alias, *script, times=times)
+        code = get_script(body)
+        times = get_times(body)
+        job = await gpio_modulate(pin_id_or_alias, code, times=times, policy=get_policy(body))
+        if wants_wait(request):
+            return await job.wait()
+
+        return job.state(), 202
+
+    elif cmd == "waveform":
+        wave = get_waveform(body)
+        times = get_times(body)
+        if not 1 <= times <= Waveform.max_times:
+            raise SchemaError(f"Waveforms must be sent between 1 and {Waveform.max_times} times")
+        # The board is blocked while the waveform is sent anyway, waiting costs nothing and surfaces errors
+        await gpio_waveform(pin_id_or_alias, wave, times=times)
 
     else:
         raise SchemaError(f"Unknown command '{cmd}'")
 
-    if request.args.get("wait", "") in ("true", "yes"):
-        await dispatcher
+
+@app.get("/ws")
+@with_websocket
+async def get_ws(_request:Request, ws:WebSocket) -> None:
+    await control.serve(ws)
+
+
+@app.post("/gpio")
+async def post_gpio_batch(request:Request) -> List[Dict[str, Any]]:
+    body:Optional[List[Dict[str, Any]]]
+    if not (body := request.json):
+        return None, 400
+
+    if not isinstance(body, list):
+        raise SchemaError("Expected a list of commands")
+
+    commands = [parse_command(entry) for entry in body]
+    return await gpio_batch(*commands, wait=wants_wait(request))
+
+
+@app.get("/groups/<group_name>")
+async def get_group(_request:Request, group_name:str) -> None:
+    state = await group_state(group_name)
+    return state
+
+
+@app.post("/groups/<group_name>")
+async def post_group(request:Request, group_name:str) -> None:
+    body:Optional[Dict[str, Any]]
+    if not (body := request.json):
+        return None, 400
+
+    cmd = get_field(body, "cmd")
+    if cmd == "on":
+        await group_on(group_name)
+
+    elif cmd == "off":
+        await group_off(group_name)
+
+    elif cmd == "set":
+        await group_apply(group_name, *get_field(body, "value"))
+
     else:
-        uasyncio.create_task(dispatcher)
+        raise SchemaError(f"Unknown command '{cmd}'")
+
+
+@app.get("/jobs")
+async def get_jobs(_request:Request) -> List[Dict[str, Any]]:
+    return await job_list()
+
+
+@app.delete("/jobs/<int:job_id>")
+async def delete_job(_request:Request, job_id:int) -> None:
+    await job_cancel(job_id)
+
+
+@app.get("/sampler")
+async def get_sampler(_request:Request) -> Dict[str, Any]:
+    return await sampler_state()
+
+
+@app.post("/sampler")
+async def post_sampler(request:Request) -> Dict[str, Any]:
+    body:Optional[Dict[str, Any]]
+    if not (body := request.json):
+        return None, 400
+
+    pins = get_field(body, "pins")
+    if not isinstance(pins, list):
+        raise SchemaError("Field 'pins' must be a list of pins")
+
+    rate_hz = get_field(body, "rate_hz")
+    size = body.get("size", 1024)
+    if not isinstance(rate_hz, int) or not isinstance(size, int):
+        raise SchemaError("Fields 'rate_hz' and 'size' must be integers")
+
+    return await sampler_start(pins, rate_hz, size)
+
+
+@app.delete("/sampler")
+async def delete_sampler(_request:Request) -> None:
+    await sampler_stop()
+
+
+@app.get("/sampler/data")
+async def get_sampler_data(request:Request) -> None:
+    encoding = request.args.get("encoding", "raw")
+    if encoding not in encodings:
+        raise SchemaError(f"Field 'encoding' must be one of: {', '.join(encodings)}")
+
+    since = request.args.get("since")
+    try:
+        since = None if since is None else int(since)
+    except ValueError:
+        raise SchemaError("Field 'since' must be an integer")
+
+    first, count, data = await sampler_data(since, encoding)
+    headers = {
+        "Content-Type": "application/octet-stream",
+        "X-Sampler-Seq": str(first),
+        "X-Sampler-Count": str(count),
+        "X-Sampler-Width": str(width()),
+    }
+    if encoding == "raw":
+        headers["Content-Length"] = str(raw_length(count))
+
+    return data, 200, headers
 
 
 @app.errorhandler(NotFound)
@@ -65,6 +233,71 @@ async def not_found(request:Request, ex:SchemaError):
     return {"error": str(ex)}, 400
 
 
+@app.errorhandler(Conflict)
+async def conflict(request:Request, ex:Conflict):
+    return {"error": str(ex)}, 409
+
+
+@app.errorhandler(Unavailable)
+async def unavailable(request:Request, ex:Unavailable):
+    return {"error": str(ex)}, 503
+
+
+def wants_wait(request:Request) -> bool:
+    return request.args.get("wait", "") in ("true", "yes")
+
+
+def parse_command(entry:Dict[str, Any]) -> Tuple[str, str, array, int, str]:
+    if not isinstance(entry, dict):
+        raise SchemaError("Expected a command object")
+
+    pin_id_or_alias = get_field(entry, "pin")
+    cmd = get_field(entry, "cmd")
+    if cmd in ("on", "off"):
+        return pin_id_or_alias, cmd, None, 1, None
+
+    if cmd == "modulate":
+        return pin_id_or_alias, cmd, get_script(entry), get_times(entry), get_policy(entry)
+
+    raise SchemaError(f"Unknown command '{cmd}'")
+
+
+def get_script(d:Dict) -> array:
+    script = get_field(d, "script")
+    if not isinstance(script, list):
+        raise SchemaError("Field 'script' must be a list of actions")
+
+    return compile_script(*script)
+
+
+def get_waveform(d:Dict) -> Waveform:
+    timings = get_field(d, "timings")
+    if not isinstance(timings, list):
+        raise SchemaError("Field 'timings' must be a list of microseconds")
+
+    options = {key: d[key] for key in ("carrier", "duty", "resolution") if key in d}
+    if not all(isinstance(value, int) for value in options.values()):
+        raise SchemaError("Fields 'carrier', 'duty' and 'resolution' must be integers")
+
+    return Waveform(*timings, **options)
+
+
+def get_times(d:Dict) -> int:
+    times = d.get("times", 1)
+    if not isinstance(times, int):
+        raise SchemaError("Field 'times' must be an integer")
+
+    return times
+
+
+def get_policy(d:Dict) -> str:
+    policy = d.get("policy", "replace")
+    if policy not in policies:
+        raise SchemaError(f"Unknown policy '{policy}'")
+
+    return policy
+
+
 def get_field(d:Dict, key:str) -> Any:
     if key not in d:
         raise MissingField(f"Missing field: {key}")
@@ -0,0 +1,202 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import machine
+
+from exceptions import SchemaError
+from pinplus import CAPTURE_MASK, PinPlus
+
+encodings = ("raw", "rle")
+max_rate_hz = 1000
+max_size = 4096
+chunk_size = 128
+
+# Samples are the levels of the sampled pins as a bitmask, the first pin in the lowest bit. They are packed
+# back-to-back in the ring, the width of a sample is rounded up to 1, 2, 4, 8 or 16 bits so samples never straddle a
+# byte boundary
+_pins:List[PinPlus] = []
+_raw_pins:tuple = ()
+_invert_mask = 0
+_width = 0
+_capacity = 0
+_ring:Optional[bytearray] = None
+_seq = 0
+_filled = 0
+_rate_hz = 0
+_timer = None
+
+
+def start(pins:List[PinPlus], rate_hz:int, size:int) -> None:
+    global _pins, _raw_pins, _invert_mask, _width, _capacity, _ring, _seq, _filled, _rate_hz, _timer
+
+    if not 1 <= len(pins) <= 16:
+        raise SchemaError("Between 1 and 16 pins can be sampled")
+    if not 1 <= rate_hz <= max_rate_hz:
+        raise SchemaError(f"The sampling rate must be between 1 and {max_rate_hz} Hz")
+    # The timer period is a whole number of milliseconds, any other rate would be silently rounded
+    if 1000 % rate_hz:
+        raise SchemaError("The sampling rate must be a divisor of 1000 Hz, like 250 or 500")
+    if not 1 <= size <= max_size:
+        raise SchemaError(f"The buffer size must be between 1 and {max_size} bytes")
+
+    stop()
+    _width = 1
+    while _width < len(pins):
+        _width *= 2
+
+    _pins = pins
+    _raw_pins = tuple(gpio_pin._pin for gpio_pin in pins)
+    _invert_mask = sum(1 << i for i, gpio_pin in enumerate(pins) if gpio_pin.invert)
+    _ring = bytearray(size)
+    _capacity = size * 8 // _width
+    _seq = 0
+    _filled = 0
+    _rate_hz = rate_hz
+    _timer = machine.Timer(-1)
+    _timer.init(period=1000 // rate_hz, mode=machine.Timer.PERIODIC, callback=_tick)
+
+
+def stop() -> None:
+    global _timer
+
+    if _timer:
+        _timer.deinit()
+        _timer = None
+
+
+def state() -> Dict[str, Any]:
+    return {
+        "running": _timer is not None,
+        "pins": [gpio_pin.id for gpio_pin in _pins],
+        "rate_hz": _rate_hz,
+        "width": _width,
+        "capacity": _capacity,
+        "seq": _seq,
+    }
+
+
+def _tick(_timer:Any) -> None:
+    # Runs from the timer interrupt, it only touches preallocated objects and small integers
+    global _seq, _filled
+
+    value = 0
+    bit = 1
+    for raw_pin in _raw_pins:
+        if raw_pin.value():
+            value |= bit
+        bit <<= 1
+
+    _put(_seq % _capacity, value ^ _invert_mask)
+    _seq = (_seq + 1) & CAPTURE_MASK
+    if _filled < _capacity:
+        _filled += 1
+
+
+def _put(index:int, value:int) -> None:
+    if _width == 16:
+        _ring[2 * index] = value & 0xff
+        _ring[2 * index + 1] = value >> 8
+    elif _width == 8:
+        _ring[index] = value
+    else:
+        pos = index * _width
+        shift = pos & 7
+        mask = ((1 << _width) - 1) << shift
+        _ring[pos >> 3] = (_ring[pos >> 3] & ~mask) | (value << shift)
+
+
+def _get(index:int) -> int:
+    if _width == 16:
+        return _ring[2 * index] | _ring[2 * index + 1] << 8
+    if _width == 8:
+        return _ring[index]
+
+    pos = index * _width
+    return (_ring[pos >> 3] >> (pos & 7)) & ((1 << _width) - 1)
+
+
+def window(since:Optional[int]=None) -> Tuple[int, int]:
+    # The sequence number of the first sample to send and how many there are. Cursors that fell behind the ring
+    # start from the oldest sample still in it, sequence numbers wrap like the ticks functions
+    seq = _seq
+    available = _filled
+    if since is not None:
+        behind = (seq - since) & CAPTURE_MASK
+        if behind < available:
+            available = behind
+
+    return (seq - available) & CAPTURE_MASK, available
+
+
+def width() -> int:
+    return _width
+
+
+def read(first:int, count:int, encoding:str="raw") -> Iterator[bytes]:
+    # Streams count samples starting at sequence number first in chunks of a reused buffer. raw packs the samples
+    # back-to-back with the same width as the ring, rle writes each run of equal samples as the sample followed by
+    # the run length as a varint
+    buffer = bytearray(chunk_size)
+    mv = memoryview(buffer)
+    n = 0
+    if encoding == "raw":
+        if _width >= 8:
+            step = _width // 8
+            for k in range(count):
+                value = _get(((first + k) & CAPTURE_MASK) % _capacity)
+                buffer[n] = value & 0xff
+                if step == 2:
+                    buffer[n + 1] = value >> 8
+                n += step
+                if n + step > chunk_size:
+                    yield mv[:n]
+                    n = 0
+        else:
+            pos = 0
+            buffer[0] = 0
+            for k in range(count):
+                buffer[n] |= _get(((first + k) & CAPTURE_MASK) % _capacity) << pos
+                pos += _width
+                if pos == 8:
+                    pos = 0
+                    n += 1
+                    if n == chunk_size:
+                        yield mv
+                        n = 0
+                    buffer[n] = 0
+            if pos:
+                n += 1
+
+        if n:
+            yield mv[:n]
+        return
+
+    step = 2 if _width == 16 else 1
+    k = 0
+    while k < count:
+        value = _get(((first + k) & CAPTURE_MASK) % _capacity)
+        run = 1
+        while k + run < count and _get(((first + k + run) & CAPTURE_MASK) % _capacity) == value:
+            run += 1
+        k += run
+
+        # Room for the sample plus a varint of up to 5 bytes
+        if n + step + 5 > chunk_size:
+            yield mv[:n]
+            n = 0
+        buffer[n] = value & 0xff
+        if step == 2:
+            buffer[n + 1] = value >> 8
+        n += step
+        while run > 0x7f:
+            buffer[n] = (run & 0x7f) | 0x80
+            run >>= 7
+            n += 1
+        buffer[n] = run
+        n += 1
+
+    if n:
+        yield mv[:n]
+
+
+def raw_length(count:int) -> int:
+    return (count * _width + 7) // 8
@@ -0,0 +1,52 @@
+from array import array
+
+from exceptions import ScriptError
+
+OP_ON = 0
+OP_OFF = 1
+OP_DELAY = 2
+OP_DELAY_US = 3
+
+# Operands are 24 bits wide in the UDP datagrams, the same limit keeps them well within the slots of the code array
+MAX_DELAY = 0xffffff
+
+
+def compile_script(*actions:str) -> array:
+    if not actions:
+        raise ScriptError("Empty script")
+
+    # Each step takes two slots, the opcode and its operand, so the executor only does integer work
+    code = array("i")
+    for action in actions:
+        if action == "on":
+            op, operand = OP_ON, 0
+
+        elif action == "off":
+            op, operand = OP_OFF, 0
+
+        elif isinstance(action, str) and action.startswith("delay "):
+            op, operand = OP_DELAY, _parse_delay(action)
+
+        elif isinstance(action, str) and action.startswith("delay_us "):
+            op, operand = OP_DELAY_US, _parse_delay(action)
+
+        else:
+            raise ScriptError(f"Unknown action: '{action}'")
+
+        code.append(op)
+        code.append(operand)
+
+    return code
+
+
+def _parse_delay(action:str) -> int:
+    _, amount = action.split(" ", 1)
+    try:
+        delay = int(amount)
+    except ValueError:
+        raise ScriptError(f"Invalid delay: '{action}'")
+
+    if not 0 <= delay <= MAX_DELAY:
+        raise ScriptError(f"Invalid delay: '{action}', it must be between 0 and {MAX_DELAY}")
+
+    return delay
@@ -0,0 +1,248 @@
+from array import array
+from typing import Any, Dict, List, Optional
+
+import socket
+import struct
+import uasyncio
+
+import jobs
+from exceptions import Conflict, NotFound, SchemaError, Unavailable
+from gpio import multicast_group, pin
+from pinplus import PinGroup, PinPlus
+from script import OP_DELAY_US, OP_ON
+
+# Datagrams are a fixed header followed by the script steps of modulate, all integers are big endian:
+#   magic:u8 flags:u8 seq:u16 pin:u8 opcode:u8 times:i16 [op:u8 operand:u24]...
+# With FLAG_GROUP the pin is the id of a multicast group instead, boards ignore the groups they aren't part of
+# Acks echo the header with the status of the command and the value of the pin or the low 16 bits of the job id:
+#   magic:u8 flags:u8 seq:u16 pin:u8 status:u8 value:u16
+MAGIC = 0xb7
+HEADER = "!BBHBBh"
+ACK = "!BBHBBH"
+HEADER_SIZE = 8
+STEP_SIZE = 4
+
+FLAG_ACK = 0x01
+FLAG_QUEUE = 0x02
+FLAG_REJECT = 0x04
+FLAG_GROUP = 0x08
+FLAG_DEDUP = 0x10
+
+OPCODE_STATE = 0
+OPCODE_ON = 1
+OPCODE_OFF = 2
+OPCODE_MODULATE = 3
+
+STATUS_OK = 0
+STATUS_NOT_FOUND = 1
+STATUS_BAD_REQUEST = 2
+STATUS_CONFLICT = 3
+STATUS_UNAVAILABLE = 4
+STATUS_DUPLICATE = 5
+
+max_datagram_size = HEADER_SIZE + 32 * STEP_SIZE
+# Senders whose recent sequence numbers are remembered, the oldest one is forgotten to make room for a new one
+max_senders = 8
+
+_sock = None
+_task = None
+_ack = bytearray(HEADER_SIZE)
+_groups:Dict[int, PinGroup] = {}
+_dedup_window = 16
+# The latest sequence number of each sender and a bitmask of the ones before it that were received
+_seen:Dict[str, List[int]] = {}
+# MicroPython's struct raises ValueError and has no struct.error
+_ACK_ERRORS = (OSError, ValueError, getattr(struct, "error", ValueError))
+
+
+class _Readable:
+    # Awaiting it suspends the task until the socket has a datagram, uasyncio has no streams for UDP
+    def __init__(self, sock:Any):
+        self.sock = sock
+
+    def __iter__(self) -> Any:
+        yield uasyncio.core._io_queue.queue_read(self.sock)
+
+    __await__ = __iter__
+
+
+def start(udp_config:Dict[str, Any]) -> None:
+    global _sock, _task, _dedup_window
+
+    # Small integers hold the window bitmask, so it can't be wider than 30 bits
+    _dedup_window = udp_config.get("dedup_window", 16)
+    if not 1 <= _dedup_window <= 30:
+        raise SchemaError("The dedup window must be between 1 and 30")
+
+    _groups.clear()
+    for multicast_name, group_id in udp_config.get("groups", {}).items():
+        if pin_group := multicast_group(multicast_name):
+            _groups[group_id] = pin_group
+
+    _sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    _sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    _sock.bind(socket.getaddrinfo("0.0.0.0", udp_config["port"])[0][-1])
+    for address in udp_config.get("multicast", ()):
+        # ip_mreq, the group address followed by the local interface, any
+        _sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, _inet_aton(address) + bytes(4))
+    _sock.setblocking(False)
+    _task = uasyncio.create_task(_serve())
+
+
+def stop() -> None:
+    global _sock, _task
+
+    if _task:
+        _task.cancel()
+        _task = None
+    if _sock:
+        _sock.close()
+        _sock = None
+
+
+async def _serve() -> None:
+    readable = _Readable(_sock)
+    while True:
+        await readable
+        try:
+            datagram, address = _sock.recvfrom(max_datagram_size)
+        except OSError:
+            continue
+
+        if len(datagram) < HEADER_SIZE or datagram[0] != MAGIC:
+            continue
+
+        _, flags, seq, pin_id, opcode, times = struct.unpack_from(HEADER, datagram)
+        pin_group = None
+        if flags & FLAG_GROUP and not (pin_group := _groups.get(pin_id)):
+            continue
+
+        try:
+            if flags & FLAG_DEDUP and _duplicate(address[0], seq):
+                value, status = 0, STATUS_DUPLICATE
+            elif pin_group:
+                value, status = execute_group(pin_group, opcode, times, flags, datagram), STATUS_OK
+            else:
+                value, status = execute(pin_id, opcode, times, flags, datagram), STATUS_OK
+        except NotFound:
+            value, status = 0, STATUS_NOT_FOUND
+        except SchemaError:
+            value, status = 0, STATUS_BAD_REQUEST
+        except Conflict:
+            value, status = 0, STATUS_CONFLICT
+        except Unavailable:
+            value, status = 0, STATUS_UNAVAILABLE
+
+        if flags & FLAG_ACK:
+            # Job ids grow without bound, a failed ack must not stop the server either way
+            try:
+                struct.pack_into(ACK, _ack, 0, MAGIC, flags, seq, pin_id, status, value & 0xffff)
+                _sock.sendto(_ack, address)
+            except _ACK_ERRORS:
+                pass
+
+
+def execute(pin_id:int, opcode:int, times:int, flags:int, datagram:bytes) -> int:
+    gpio_pin:Optional[PinPlus]
+    if not (gpio_pin := pin(pin_id)):
+        raise NotFound(f"Pin not found: {pin_id}")
+
+    if opcode == OPCODE_STATE:
+        return gpio_pin.value()
+
+    elif opcode == OPCODE_ON:
+        gpio_pin.on()
+        return gpio_pin.value()
+
+    elif opcode == OPCODE_OFF:
+        gpio_pin.off()
+        return gpio_pin.value()
+
+    elif opcode == OPCODE_MODULATE:
+        code = _read_script(datagram)
+        return jobs.submit(gpio_pin, gpio_pin.modulate(code, times=times), _policy(flags)).id
+
+    raise SchemaError(f"Unknown opcode {opcode}")
+
+
+def execute_group(pin_group:PinGroup, opcode:int, times:int, flags:int, datagram:bytes) -> int:
+    # Values are acknowledged as a bitmask with the first pin of the group in the lowest bit
+    if opcode == OPCODE_STATE:
+        return _bitmask(pin_group)
+
+    elif opcode == OPCODE_ON:
+        pin_group.on()
+        return _bitmask(pin_group)
+
+    elif opcode == OPCODE_OFF:
+        pin_group.off()
+        return _bitmask(pin_group)
+
+    elif opcode == OPCODE_MODULATE:
+        # Each pin runs its own job, the number of jobs started is acknowledged
+        code = _read_script(datagram)
+        policy = _policy(flags)
+        for gpio_pin in pin_group.pins:
+            jobs.submit(gpio_pin, gpio_pin.modulate(code, times=times), policy)
+        return len(pin_group.pins)
+
+    raise SchemaError(f"Unknown opcode {opcode}")
+
+
+def _duplicate(sender:str, seq:int) -> bool:
+    if not (seen := _seen.get(sender)):
+        if len(_seen) >= max_senders:
+            del _seen[next(iter(_seen))]
+        _seen[sender] = [seq, 1]
+        return False
+
+    last, mask = seen
+    ahead = (seq - last) & 0xffff
+    if 0 < ahead < 0x8000:
+        seen[0] = seq
+        # The bits that would fall out of the window are cleared before shifting so the mask never outgrows it
+        seen[1] = (mask & ((1 << (_dedup_window - ahead)) - 1)) << ahead | 1 if ahead < _dedup_window else 1
+        return False
+
+    # Sequence numbers older than the window can't be told apart from duplicates and are dropped too
+    behind = (last - seq) & 0xffff
+    if behind >= _dedup_window or mask & (1 << behind):
+        return True
+
+    seen[1] = mask | (1 << behind)
+    return False
+
+
+def _bitmask(pin_group:PinGroup) -> int:
+    value = 0
+    for i, gpio_pin in enumerate(pin_group.pins):
+        if gpio_pin.value():
+            value |= 1 << i
+    return value
+
+
+def _policy(flags:int) -> str:
+    return "queue" if flags & FLAG_QUEUE else "reject" if flags & FLAG_REJECT else "replace"
+
+
+def _inet_aton(address:str) -> bytes:
+    return bytes(int(part) for part in address.split("."))
+
+
+def _read_script(datagram:bytes) -> array:
+    steps = (len(datagram) - HEADER_SIZE) // STEP_SIZE
+    if not steps:
+        raise SchemaError("Empty script")
+
+    # The steps are already compiled, they are only checked before being copied into the executor's format
+    code = array("i", [0] * (2 * steps))
+    for i in range(steps):
+        word = struct.unpack_from("!I", datagram, HEADER_SIZE + i * STEP_SIZE)[0]
+        op = word >> 24
+        if not OP_ON <= op <= OP_DELAY_US:
+            raise SchemaError(f"Unknown script opcode {op}")
+
+        code[2 * i] = op
+        code[2 * i + 1] = word & 0xffffff
+
+    return code
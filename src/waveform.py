@@ -0,0 +1,96 @@
+from array import array
+
+from exceptions import ScriptError
+
+
+class Waveform:
+    # Shared by all waveforms, machine.bitstream blocks until the whole buffer is sent so only one is emitted at a time
+    buffer = bytearray(512)
+    # machine.bitstream runs with interrupts disabled, both the period of a bit and the time a waveform takes are
+    # bounded so the watchdog is fed in time. Periods past ~53ms would also overflow its conversion to CPU cycles
+    min_carrier = 1000
+    max_carrier = 100000
+    max_resolution = 10000
+    max_duration_us = 100000
+    # Interrupts are enabled in between, but the event loop is blocked for all the repetitions
+    max_times = 10
+
+    def __init__(self, *timings:int, carrier:int=0, duty:int=33, resolution:int=10):
+        # Timings are microseconds alternating mark and space, starting with a mark. Each one is quantized into bits
+        # of a fixed period that machine.bitstream emits back to back: with a carrier every mark bit is one carrier
+        # cycle, without it mark bits are held high for the whole period
+        if not timings:
+            raise ScriptError("Empty waveform")
+
+        if not all(isinstance(timing, int) and timing > 0 for timing in timings):
+            raise ScriptError("Waveform timings must be positive integers")
+
+        if carrier:
+            if not self.min_carrier <= carrier <= self.max_carrier:
+                raise ScriptError(f"Carrier must be between {self.min_carrier} and {self.max_carrier} Hz")
+            if not 0 < duty < 100:
+                raise ScriptError("Duty must be between 1 and 99")
+
+            period = 1000000000 // carrier
+            mark_high = period * duty // 100
+        else:
+            if not 1 <= resolution <= self.max_resolution:
+                raise ScriptError(f"Resolution must be between 1 and {self.max_resolution} us")
+
+            period = resolution * 1000
+            mark_high = period
+
+        # (high_ns, low_ns) for a 0 bit followed by a 1 bit, as machine.bitstream expects with encoding 0. It sets the
+        # pin high at the start of every bit, so a space bit still carries a pulse of a few CPU cycles (~60ns at 80MHz)
+        # and, when inverted, every mark bit a dip as short. Bitstream only sends whole bytes of bits that all begin
+        # with that edge, splitting the waveform into runs would trade it for padding bits with the same glitch and the
+        # jitter of the code in between. The pulses are too short to switch an LED driver or an RF transmitter module,
+        # loads that react to them must be driven with scripts instead
+        self.timing = (0, period, mark_high, period - mark_high)
+        self.inverted_timing = (period, 0, period - mark_high, mark_high)
+
+        self.runs = array("H")
+        for timing in timings:
+            bits = (timing * 1000 + period // 2) // period
+            if not bits:
+                raise ScriptError(f"Timing {timing}us is shorter than the waveform period")
+            self.runs.append(bits)
+
+        self.bits = sum(self.runs)
+        if self.bits > len(self.buffer) * 8:
+            raise ScriptError(f"Waveform too long, it takes {self.bits} periods out of {len(self.buffer) * 8}")
+
+        duration_us = self.bits * period // 1000
+        if duration_us > self.max_duration_us:
+            raise ScriptError(f"Waveform too long, it takes {duration_us}us out of {self.max_duration_us}us")
+
+    def render(self) -> memoryview:
+        buf = self.buffer
+        length = (self.bits + 7) // 8
+        for i in range(length):
+            buf[i] = 0
+
+        position = 0
+        mark = True
+        for bits in self.runs:
+            if mark:
+                self._fill(position, position + bits)
+            position += bits
+            mark = not mark
+
+        return memoryview(buf)[:length]
+
+    def _fill(self, start:int, end:int) -> None:
+        buf = self.buffer
+        while start < end and start & 7:
+            buf[start >> 3] |= 0x80 >> (start & 7)
+            start += 1
+
+        while start + 8 <= end:
+            buf[start >> 3] = 0xFF
+            start += 8
+
+        while start < end:
+            buf[start >> 3] |= 0x80 >> (start & 7)
+            start += 1
+
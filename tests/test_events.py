@@ -0,0 +1,80 @@
+# Runs the pin event hubs under CPython with the stand-ins of the benchmarks, python3 -m unittest discover tests
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+import events  # noqa: E402
+from machine import Pin  # noqa: E402
+from pinplus import PinPlus  # noqa: E402
+
+EVENT = b'id: %d\nevent: change\ndata: {"value": %s, "edges": %d}\n\n'
+
+
+class TestHub(unittest.TestCase):
+    def setUp(self):
+        events.hubs.clear()
+        self.queue_size = events.queue_size
+        events.queue_size = 2
+        self.pin = PinPlus(5, Pin.IN)
+
+    def tearDown(self):
+        events.queue_size = self.queue_size
+
+    async def edge(self) -> None:
+        # The stand-in pins never fire their IRQ, the handler installed by capture is called by hand
+        self.pin._pin.level ^= 1
+        self.pin._pin.handler(self.pin._pin)
+        await asyncio.sleep(events.merge_ms / 1000 + 0.01)
+
+    def test_drop_last_subscriber(self):
+        async def run():
+            subscriber = events.subscribe(self.pin)
+            hub = events.hubs[self.pin.id]
+            task = hub._task
+            for _ in range(events.queue_size):
+                await self.edge()
+
+            # The subscriber is dropped from the hub's own task, which ends instead of cancelling itself
+            self.assertTrue(subscriber.dropped)
+            self.assertTrue(task.done())
+            self.assertIsNone(task.exception())
+            self.assertIsNone(hub._task)
+            self.assertIsNone(self.pin._pin.handler)
+
+            subscriber = events.subscribe(self.pin)
+            self.assertEqual(await subscriber.__anext__(), EVENT % (4, b"false", 0))
+            await self.edge()
+            self.assertEqual(await subscriber.__anext__(), EVENT % (5, b"true", 1))
+            await subscriber.aclose()
+            self.assertIsNone(hub._task)
+
+        asyncio.run(run())
+
+    def test_unsubscribe(self):
+        async def run():
+            first = events.subscribe(self.pin)
+            second = events.subscribe(self.pin)
+            hub = events.hubs[self.pin.id]
+            task = hub._task
+
+            await first.aclose()
+            self.assertIs(hub._task, task)
+            await self.edge()
+            self.assertEqual(len(second.queue), 2)
+
+            await second.aclose()
+            await asyncio.sleep(0)
+            self.assertTrue(task.cancelled())
+            self.assertIsNone(hub._task)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
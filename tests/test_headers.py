@@ -0,0 +1,87 @@
+# Runs the lazy header parsing of microdot under CPython with the stand-ins of the benchmarks,
+# python3 -m unittest discover tests
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+from microdot import LazyHeaders  # noqa: E402
+from microdot_asyncio import Microdot, Request  # noqa: E402
+
+GET = b"GET /gpio/led HTTP/1.1\r\nHost: board\r\nUser-Agent: curl/8.0\r\nAccept: */*\r\n\r\n"
+
+
+def create(data:bytes) -> Request:
+    async def run():
+        stream = asyncio.StreamReader()
+        stream.feed_data(data)
+        stream.feed_eof()
+        return await Request.create(Microdot(), stream, None, ("127.0.0.1", 1234))
+
+    return asyncio.run(run())
+
+
+class TestLazyHeaders(unittest.TestCase):
+    def setUp(self):
+        self.allowlist = Request.header_allowlist
+        Request.header_allowlist = ()
+
+    def tearDown(self):
+        Request.header_allowlist = self.allowlist
+
+    def test_parsed_miss(self):
+        headers = LazyHeaders({"Connection": "close"}, parsed={"connection", "content-length"})
+        headers.deferred = [b"User-Agent: curl/8.0", b"Accept: */*"]
+
+        self.assertNotIn("Content-Length", headers)
+        self.assertIsNone(headers.get("content-length"))
+        self.assertEqual(headers.get("Content-Length", "0"), "0")
+        with self.assertRaises(KeyError):
+            headers["Content-Length"]
+        self.assertEqual(headers["CONNECTION"], "close")
+        self.assertEqual(len(headers.deferred), 2)
+
+    def test_deferred_miss(self):
+        headers = LazyHeaders(parsed={"connection"})
+        headers.deferred = [b"User-Agent: curl/8.0", b"Accept: */*"]
+
+        self.assertEqual(headers["accept"], "*/*")
+        self.assertEqual(headers.deferred, [])
+        self.assertNotIn("Authorization", headers)
+        self.assertEqual(dict(headers.items()), {"User-Agent": "curl/8.0", "Accept": "*/*"})
+
+    def test_request_without_body(self):
+        req = create(GET)
+        self.assertEqual(req.content_length, 0)
+        self.assertIsNone(req.content_type)
+        self.assertIsNone(req.headers.get("Connection"))
+        self.assertIsNone(req.headers.get("If-None-Match"))
+        self.assertEqual(len(req.headers.deferred), 3)
+
+        self.assertEqual(req.headers["user-agent"], "curl/8.0")
+        self.assertEqual(req.headers.deferred, [])
+        self.assertEqual(req.headers["Host"], "board")
+
+    def test_request_with_body(self):
+        req = create(b'POST /gpio/led HTTP/1.1\r\nHost: board\r\nContent-Type: application/json\r\n'
+                     b'Content-Length: 13\r\n\r\n{"cmd": "on"}')
+        self.assertEqual(req.content_length, 13)
+        self.assertEqual(req.json, {"cmd": "on"})
+        self.assertEqual(len(req.headers.deferred), 1)
+
+    def test_allowlist(self):
+        Request.header_allowlist = ("Accept",)
+        req = create(GET)
+        self.assertEqual(len(req.headers.deferred), 2)
+        self.assertEqual(req.headers.get("Accept"), "*/*")
+        self.assertIsNone(req.headers.get("Authorization"))
+        self.assertEqual(req.headers.deferred, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
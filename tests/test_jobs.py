@@ -0,0 +1,134 @@
+# Runs the job registry under CPython with the stand-ins of the benchmarks, python3 -m unittest discover tests
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+import jobs  # noqa: E402
+from actions import job_list  # noqa: E402
+from machine import Pin  # noqa: E402
+from pinplus import PinPlus  # noqa: E402
+from script import compile_script  # noqa: E402
+
+# Toggles the pin until it's cancelled
+FOREVER = compile_script("on", "delay 5", "off", "delay 5")
+
+
+class TestJobQueues(unittest.TestCase):
+    def setUp(self):
+        jobs.registry.clear()
+        jobs.pin_queues.clear()
+        jobs.finished.clear()
+        self.pin = PinPlus(4, Pin.OUT)
+
+    def submit(self, policy:str) -> jobs.Job:
+        return jobs.submit(self.pin, self.pin.modulate(FOREVER, times=0), policy)
+
+    def test_queue(self):
+        async def run():
+            a = self.submit("replace")
+            b = self.submit("queue")
+            await asyncio.sleep(0.02)
+            self.assertEqual((a.status, b.status), ("running", "queued"))
+            self.assertEqual(jobs.pin_queues[self.pin.id], [a, b])
+
+            task = a._task
+            jobs.cancel(a.id)
+            await asyncio.sleep(0.02)
+            self.assertTrue(task.done())
+            self.assertEqual((a.status, b.status), ("cancelled", "running"))
+            self.assertEqual(list(jobs.registry), [b.id])
+
+            jobs.cancel(b.id)
+            await asyncio.sleep(0.02)
+            self.assertEqual((jobs.registry, jobs.pin_queues), ({}, {}))
+
+        asyncio.run(run())
+
+    def test_cancel_queued(self):
+        async def run():
+            a = self.submit("replace")
+            b = self.submit("queue")
+            await asyncio.sleep(0.02)
+
+            task = a._task
+            jobs.cancel(b.id)
+            await asyncio.sleep(0.02)
+            self.assertEqual((a.status, b.status), ("running", "cancelled"))
+            self.assertIs(a._task, task)
+            self.assertEqual(list(jobs.registry), [a.id])
+            self.assertEqual(jobs.pin_queues[self.pin.id], [a])
+            self.assertEqual(len(asyncio.all_tasks()), 2)
+
+            jobs.cancel(a.id)
+            await asyncio.sleep(0.02)
+            self.assertTrue(task.done())
+            self.assertEqual((jobs.registry, jobs.pin_queues), ({}, {}))
+
+        asyncio.run(run())
+
+    def test_replace_with_queue(self):
+        async def run():
+            a = self.submit("replace")
+            b = self.submit("queue")
+            await asyncio.sleep(0.02)
+
+            task = a._task
+            c = self.submit("replace")
+            self.assertEqual((a.status, b.status, c.status), ("cancelled", "cancelled", "queued"))
+            await asyncio.sleep(0.02)
+            self.assertTrue(task.done())
+            self.assertEqual(c.status, "running")
+            self.assertEqual(list(jobs.registry), [c.id])
+            self.assertEqual(jobs.pin_queues[self.pin.id], [c])
+            self.assertEqual(len(asyncio.all_tasks()), 2)
+
+            jobs.cancel(c.id)
+            await asyncio.sleep(0.02)
+            self.assertEqual((jobs.registry, jobs.pin_queues), ({}, {}))
+
+        asyncio.run(run())
+
+    def test_replace_before_start(self):
+        async def run():
+            a = self.submit("replace")
+            b = self.submit("replace")
+            self.assertEqual(a.status, "cancelled")
+            await asyncio.sleep(0.02)
+            self.assertEqual(b.status, "running")
+            self.assertEqual(list(jobs.registry), [b.id])
+
+            jobs.cancel(b.id)
+            await asyncio.sleep(0.02)
+            self.assertEqual((jobs.registry, jobs.pin_queues), ({}, {}))
+
+        asyncio.run(run())
+
+    def test_finished(self):
+        async def run():
+            a = jobs.submit(self.pin, self.pin.modulate(compile_script("on", "delay 5", "off"), times=1))
+            await a.wait()
+            b = self.submit("replace")
+            await asyncio.sleep(0.02)
+
+            # The registry only has the running job, the result of the one that finished is kept for its pin
+            self.assertEqual(list(jobs.registry), [b.id])
+            states = await job_list()
+            self.assertEqual([(state["id"], state["status"]) for state in states], [(a.id, "done"), (b.id, "running")])
+            self.assertEqual(set(states[0]["result"]), {"max_error_us", "drift_us", "missed_deadlines"})
+            self.assertIsNone(states[1]["result"])
+
+            jobs.cancel(b.id)
+            await asyncio.sleep(0.02)
+            self.assertEqual([(state["id"], state["status"]) for state in await job_list()], [(b.id, "cancelled")])
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+# Runs the streamed JSON encoder of microdot under CPython with the stand-ins of the benchmarks,
+# python3 -m unittest discover tests
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+from microdot import JSONStream  # noqa: E402
+from microdot_asyncio import Response  # noqa: E402
+
+DOCUMENTS = (
+    {},
+    [],
+    {"value": False, "config": {"id": 2, "inverted": True, "mode": "OUT", "pull": None, "drive": None, "alt": None}},
+    [{"id": n, "pin": n % 3, "status": "running", "result": None} for n in range(40)],
+    {"samples": [[n, n * 37 % 1000, n & 1] for n in range(200)], "rate": 0.25, "overrun": False},
+    {"nested": [[[], {}], [[[1, 2.5, -3]]], {"a": {"b": {"c": []}}}], "tuple": (1, "two", None)},
+    {"escapes": 'quote " backslash \\ newline \n tab \t nul \x00', "unicode": "café ☃ \U0001f600"},
+    {"long": "x" * 1000, "after": ["y" * 255, "z" * 256, "w" * 257]},
+    {1: "int key", "2": "str key"},
+)
+
+
+def sizes(document) -> tuple:
+    # Buffers smaller, around and larger than the document, so tokens are split at every offset
+    length = len(json.dumps(document))
+    return (1, 2, 7, 64, max(1, length - 1), length, length + 1, 256)
+
+
+class FakeStream:
+    def __init__(self):
+        self.data = bytearray()
+
+    async def awrite(self, data) -> None:
+        self.data += data
+
+
+class TestJSONStream(unittest.TestCase):
+    def setUp(self):
+        self.buffer_size = JSONStream.buffer_size
+
+    def tearDown(self):
+        JSONStream.buffer_size = self.buffer_size
+
+    def each(self, test) -> None:
+        for document in DOCUMENTS:
+            for size in sizes(document):
+                JSONStream.buffer_size = size
+                with self.subTest(document=json.dumps(document)[:40], size=size):
+                    test(document, json.dumps(document).encode())
+
+    def test_chunks(self):
+        def test(document, expected):
+            # Each chunk is only valid until the next one is requested
+            chunks = [bytes(chunk) for chunk in JSONStream(document)]
+            self.assertEqual(b"".join(chunks), expected)
+            self.assertTrue(all(0 < len(chunk) <= JSONStream.buffer_size for chunk in chunks))
+
+        self.each(test)
+
+    def test_length(self):
+        def test(document, expected):
+            stream = JSONStream(document)
+            self.assertEqual(len(stream), len(expected))
+            self.assertEqual(b"".join(bytes(chunk) for chunk in stream), expected)
+
+        self.each(test)
+
+    def test_response(self):
+        def test(document, expected):
+            async def run():
+                stream = FakeStream()
+                await Response(document).write(stream)
+                return bytes(stream.data)
+
+            head, body = asyncio.run(run()).split(b"\r\n\r\n", 1)
+            self.assertEqual(body, expected)
+            self.assertIn(b"\r\nContent-Length: %d\r\n" % len(expected), head + b"\r\n")
+            self.assertIn(b"\r\nContent-Type: application/json; charset=UTF-8\r\n", head + b"\r\n")
+
+        self.each(test)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# Runs the pooled request reader of microdot under CPython with the stand-ins of the benchmarks,
+# python3 -m unittest discover tests
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+import microdot_asyncio  # noqa: E402
+from microdot_asyncio import BufferPool, Request, _BufferedReader  # noqa: E402
+
+
+class ChunkedStream:
+    # Hands out the data a few bytes at a time, so lines and bodies are split across reads
+    def __init__(self, data:bytes, chunk:int):
+        self.data = data
+        self.chunk = chunk
+
+    async def read(self, n:int=-1) -> bytes:
+        n = min(self.chunk, len(self.data)) if n < 0 else min(n, self.chunk)
+        data, self.data = self.data[:n], self.data[n:]
+        return data
+
+
+def post(path:str, body:bytes) -> bytes:
+    return f"POST {path} HTTP/1.1\r\nHost: board\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+
+
+def get(path:str, *headers:str) -> bytes:
+    return "\r\n".join((f"GET {path} HTTP/1.1", "Host: board") + headers + ("", "")).encode()
+
+
+class TestBufferedReader(unittest.TestCase):
+    def setUp(self):
+        self.allowlist = Request.header_allowlist
+        self.find = microdot_asyncio._bytearray_find
+
+    def tearDown(self):
+        Request.header_allowlist = self.allowlist
+        microdot_asyncio._bytearray_find = self.find
+
+    def read(self, data:bytes, size:int=64, chunk:int=7) -> list:
+        # Reads every request like Microdot.handle_request, returning (method, path, headers, body) for each one
+        pool = BufferPool(1, size)
+
+        async def run():
+            reader = _BufferedReader(ChunkedStream(data, chunk), pool)
+            requests = []
+            while req := await Request.create(None, reader, None, ("127.0.0.1", 1234)):
+                requests.append((req.method, req.path, dict(req.headers.items()), req.body))
+                reader.release()
+            reader.release(force=True)
+            return requests
+
+        requests = asyncio.run(run())
+        self.assertEqual([len(buffer) for buffer in pool.buffers], [size])
+        return requests
+
+    def modes(self, test):
+        # bytearray.find where the platform has it, and the line ends found in each chunk as on MicroPython
+        for find in (True, False):
+            microdot_asyncio._bytearray_find = find
+            for allowlist in (None, ()):
+                Request.header_allowlist = allowlist
+                with self.subTest(find=find, allowlist=allowlist):
+                    test()
+
+    def test_pipelined(self):
+        data = get("/gpio/led", "Accept: */*") + post("/gpio/led", b'{"cmd": "on"}') + get("/jobs")
+
+        def test():
+            requests = self.read(data)
+            self.assertEqual([(method, path) for method, path, _, _ in requests],
+                             [("GET", "/gpio/led"), ("POST", "/gpio/led"), ("GET", "/jobs")])
+            self.assertEqual(requests[0][2], {"Host": "board", "Accept": "*/*"})
+            self.assertEqual(requests[1][3], b'{"cmd": "on"}')
+            self.assertEqual(requests[2][3], b"")
+
+        self.modes(test)
+
+    def test_body_larger_than_buffer(self):
+        body = bytes(range(256)) * 2
+
+        def test():
+            requests = self.read(post("/gpio", body) + get("/jobs"))
+            self.assertEqual(requests[0][3], body)
+            self.assertEqual(requests[1][:2], ("GET", "/jobs"))
+
+        self.modes(test)
+
+    def test_line_larger_than_buffer(self):
+        cookie = "Cookie: " + "x" * 1500
+
+        def test():
+            requests = self.read(get("/gpio/led", cookie, "Accept: */*") + get("/jobs"), size=1024, chunk=512)
+            self.assertEqual(requests[0][2]["Cookie"], "x" * 1500)
+            self.assertEqual(requests[0][2]["Accept"], "*/*")
+            self.assertEqual(requests[1][:2], ("GET", "/jobs"))
+
+        self.modes(test)
+
+    def test_line_too_long(self):
+        def test():
+            with self.assertRaises(ValueError):
+                self.read(get("/gpio/led", "Cookie: " + "x" * Request.max_readline), size=1024, chunk=512)
+
+        self.modes(test)
+
+
+if __name__ == "__main__":
+    unittest.main()
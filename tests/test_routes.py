@@ -0,0 +1,102 @@
+# Runs the route index of microdot under CPython with the stand-ins of the benchmarks,
+# python3 -m unittest discover tests
+import itertools
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+import server  # noqa: E402
+
+server.install()
+
+import routes  # noqa: E402
+from microdot import Microdot  # noqa: E402
+
+METHODS = ("GET", "POST", "PUT", "DELETE")
+
+
+class FakeRequest:
+    def __init__(self, method:str, path:str):
+        self.method = method
+        self.path = path
+        self.url_args = None
+
+
+def linear(app:Microdot, method:str, path:str) -> tuple:
+    # The scan of the URL map find_route replaced, the first route matching the path and the method wins
+    found = 404
+    for methods, pattern, handler in app.url_map:
+        if (args := pattern.match(path)) is not None:
+            if method in methods:
+                return handler, args
+            found = 405
+    return found, None
+
+
+def handler(name:str):
+    def f(_request, **_kwargs):
+        return name
+
+    f.__name__ = name
+    return f
+
+
+def overlapping() -> Microdot:
+    # Static, string, int, path and re routes that shadow each other in both orders
+    app = Microdot()
+    app.route("/")(handler("index"))
+    app.route("/users/<name>")(handler("user_name"))
+    app.route("/users/<int:id>")(handler("user_id"))
+    app.route("/users/me", methods=["GET", "PUT"])(handler("me"))
+    app.route("/users/<int:id>", methods=["DELETE"])(handler("delete_user"))
+    app.route("/items/<int:id>/parts/<part>")(handler("part"))
+    app.route("/items/<path:rest>", methods=["GET", "POST"])(handler("items_path"))
+    app.route("/items/<int:id>")(handler("item"))
+    app.route("/items/<re:[a-z]+:slug>", methods=["PUT"])(handler("item_slug"))
+    app.route("/files/<path:rest>")(handler("files"))
+    app.route("/files/readme", methods=["POST"])(handler("readme"))
+    app.route("/<a>/<b>", methods=["POST"])(handler("pair"))
+    app.route("/a/<int:n>/c")(handler("a_c"))
+    app.route("/a/<x>/c", methods=["DELETE"])(handler("a_x_c"))
+    return app
+
+
+PATHS = (
+    "/", "", "//", "/users", "/users/", "/users/me", "/users/42", "/users/bob", "/users/42/", "/users/42/x",
+    "/items/7", "/items/seven", "/items/7/parts/a", "/items/7/parts", "/items/7/parts/a/b", "/items/", "/files",
+    "/files/", "/files/readme", "/files/a/b/c", "/a/b", "/a/1/c", "/a/x/c", "/x/y", "/x/y/z", "/mem", "/stats",
+    "/gpio", "/gpio/led", "/gpio/2", "/gpio/led/events", "/gpio/led/measure", "/gpio/led/x", "/ws", "/jobs",
+    "/jobs/3", "/jobs/x", "/jobs/3/x", "/groups/lights", "/groups", "/sampler", "/sampler/data", "/sampler/x",
+    "/nope",
+)
+
+
+class TestFindRoute(unittest.TestCase):
+    def check(self, app:Microdot) -> None:
+        for method, path in itertools.product(METHODS, PATHS):
+            with self.subTest(method=method, path=path):
+                req = FakeRequest(method, path)
+                found = app.find_route(req)
+                expected, args = linear(app, method, path)
+                self.assertEqual(found, expected)
+                self.assertEqual(req.url_args, args)
+
+    def test_overlapping_routes(self):
+        self.check(overlapping())
+
+    def test_app_routes(self):
+        self.check(routes.app)
+
+    def test_route_added_after_index(self):
+        app = overlapping()
+        self.assertEqual(app.find_route(FakeRequest("PUT", "/x/y")), 405)
+
+        app.route("/x/<int:n>", methods=["PUT"])(handler("x"))
+        app.route("/<a>/<b>", methods=["PUT"])(handler("pair_put"))
+        self.assertEqual(app.find_route(FakeRequest("PUT", "/x/y")).__name__, "pair_put")
+        self.check(app)
+
+
+if __name__ == "__main__":
+    unittest.main()